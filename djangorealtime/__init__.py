@@ -14,7 +14,19 @@ Basic usage:
 # Main API
 # Core components
 from .listener import Listener
-from .publisher import publish, publish_global, publish_system, subscribe
+from .publisher import (
+    apublish,
+    apublish_global,
+    apublish_system,
+    publish,
+    publish_global,
+    publish_many,
+    publish_many_global,
+    publish_many_users,
+    publish_system,
+    replay_queryset,
+    subscribe,
+)
 from .structs import Event, Scope, Status
 
 __version__ = '0.1.0'
@@ -24,8 +36,15 @@ __all__ = [
     'Listener',
     'Scope',
     'Status',
+    'apublish',
+    'apublish_global',
+    'apublish_system',
     'publish',
     'publish_global',
+    'publish_many',
+    'publish_many_global',
+    'publish_many_users',
     'publish_system',
+    'replay_queryset',
     'subscribe',
 ]
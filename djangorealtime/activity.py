@@ -0,0 +1,152 @@
+import atexit
+import threading
+from collections import deque
+
+from django.db import connection
+
+from .config import Config
+from .utils import get_event_model, logger
+
+# Activity modes, per event type (ACTIVITY_MODE_BY_TYPE), scope (ACTIVITY_MODE_BY_SCOPE) or default
+FULL = 'full'  # One EventActivity row per status change and recipient
+COUNTERS = 'counters'  # Per-status counts on the event
+OFF = 'off'  # Nothing recorded, the event status stays as published
+ACTIVITY_MODES = (FULL, COUNTERS, OFF)
+
+
+def activity_mode(event) -> str:
+    mode = Config.ACTIVITY_MODE_BY_TYPE.get(event.type)
+    if mode is None:
+        mode = Config.ACTIVITY_MODE_BY_SCOPE.get(event.scope, Config.ACTIVITY_MODE)
+    if mode not in ACTIVITY_MODES:
+        raise ValueError(f"Unknown activity mode: {mode}")
+    return mode
+
+
+class ActivityWriter:
+    """
+    Buffers event status transitions in memory and writes them in batches
+    from a background thread, using Event.add_activities.
+
+    Counter activities are merged in the buffer into one count per event and status,
+    and written with Event.add_counts, so a broadcast to 10k connections is one row update.
+
+    The buffer is bounded by ACTIVITY_BUFFER_SIZE. When it is full new activities
+    are dropped and counted in `dropped`. Whatever is still buffered on interpreter
+    shutdown is flushed if ACTIVITY_FLUSH_ON_SHUTDOWN is enabled.
+    """
+
+    def __init__(self):
+        self.dropped = 0
+        self._buffer = deque()
+        self._counts: dict[tuple[str, str], int] = {}  # (event_id, status_label) -> count
+        self._lock = threading.Lock()
+        # Serializes flushes, so flush() returns only once earlier batches are written too
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def record(
+            self,
+            event_id: str,
+            status_label: str,
+            user_id: str | None = None,
+            counter: bool = False,
+    ) -> bool:
+        """
+        Buffer an activity, or a count increment with `counter`.
+        Returns False if it was dropped because the buffer is full.
+        """
+        key = (event_id, status_label)
+        with self._lock:
+            if counter and key in self._counts:
+                self._counts[key] += 1
+                return True
+            if len(self._buffer) + len(self._counts) >= Config.ACTIVITY_BUFFER_SIZE:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    logger.warning(f"Activity buffer full, dropped {self.dropped} activities")
+                return False
+            if counter:
+                self._counts[key] = 1
+                batch_ready = False
+            else:
+                self._buffer.append((event_id, status_label, str(user_id) if user_id else None))
+                batch_ready = len(self._buffer) >= Config.ACTIVITY_BATCH_SIZE
+
+        self._ensure_started()
+        if batch_ready:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """Write everything buffered so far. Returns the number of activities written."""
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        written = self._flush_counts(counts)
+        while True:
+            with self._lock:
+                size = min(len(self._buffer), Config.ACTIVITY_BATCH_SIZE)
+                batch = [self._buffer.popleft() for _ in range(size)]
+            if not batch:
+                return written
+            try:
+                get_event_model().add_activities(batch)
+                written += len(batch)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} activities: {e}", exc_info=True)
+
+    def _flush_counts(self, counts: dict) -> int:
+        written = 0
+        items = list(counts.items())
+        for start in range(0, len(items), Config.ACTIVITY_BATCH_SIZE):
+            batch = dict(items[start:start + Config.ACTIVITY_BATCH_SIZE])
+            try:
+                get_event_model().add_counts(batch)
+                written += sum(batch.values())
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} activity counts: {e}", exc_info=True)
+        return written
+
+    def stop(self):
+        """Stop the writer thread, flushing or discarding the remaining buffer."""
+        self._stopped.set()
+        self._wakeup.set()
+        if Config.ACTIVITY_FLUSH_ON_SHUTDOWN:
+            self.flush()
+        else:
+            with self._lock:
+                self.dropped += len(self._buffer) + sum(self._counts.values())
+                self._buffer.clear()
+                self._counts.clear()
+
+    def __len__(self):
+        return len(self._buffer) + len(self._counts)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(Config.ACTIVITY_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                if Config.CLOSE_DB_PER_EVENT:
+                    connection.close()
+
+
+activity_writer = ActivityWriter()
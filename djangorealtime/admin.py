@@ -5,6 +5,7 @@ try:
     from django.utils.html import format_html
 
     from djangorealtime.models import Event, EventActivity
+    from djangorealtime.publisher import replay_queryset
 
     class EventActivityInline(admin.TabularInline):
         model = EventActivity
@@ -17,7 +18,10 @@ try:
         list_filter = ['type', 'scope', 'status', 'created_at']
         list_per_page = 10
         search_fields = ['id', 'type', 'user_id']
-        readonly_fields = ['created_at', 'updated_at', 'detail_pretty', 'data_store_pretty']
+        readonly_fields = [
+            'created_at', 'updated_at', 'detail_pretty', 'data_store_pretty',
+            'dispatched_count', 'sent_count', 'delivered_count', 'read_count', 'error_count',
+        ]
         date_hierarchy = 'created_at'
         ordering = ['-created_at']
         actions = ['replay_events']
@@ -25,9 +29,8 @@ try:
 
         @admin.action(description='Replay selected events')
         def replay_events(self, request, queryset):
-            for event in queryset:
-                event.replay()
-            self.message_user(request, f'{queryset.count()} event(s) replayed successfully.')
+            replayed = replay_queryset(queryset)
+            self.message_user(request, f'{replayed} event(s) replayed successfully.')
 
         def detail_pretty(self, obj):
             return format_html('<pre>{}</pre>', json.dumps(obj.detail, indent=2))
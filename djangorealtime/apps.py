@@ -17,8 +17,9 @@ class DjangorealtimeConfig(AppConfig):
         # Check if auto-listen is enabled (defaults to True)
         auto_listen = Config.AUTO_LISTEN
 
-        # Only start listener if auto_listen is True and running under a web server
-        if auto_listen and self._is_running_server():
+        # Only start listener if auto_listen is True and running under a web server.
+        # In async mode the listener is started on the server's event loop by the SSE view.
+        if auto_listen and Config.LISTENER_MODE == 'thread' and self._is_running_server():
             listener = Listener()
             listener.start()
 
@@ -1,17 +1,77 @@
+import time
 from abc import ABC, abstractmethod
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 
+from asgiref.sync import sync_to_async
+
+from .. import metrics
 from ..structs import Event
 
 
 class BaseRealtimeBackend(ABC):
     def __init__(self, **options):
         self.options = options
+        # Unix time the listen connection was last known to be alive
+        self.alive_at = None
+        # Called with the previous alive_at each time listen()/alisten() (re)establishes LISTEN.
+        # Must not block, it runs inside the listen loop.
+        self.on_listen = None
+
+    def listening(self):
+        """To be called by listen()/alisten() implementations once LISTEN is established."""
+        previous_alive_at = self.alive_at
+        self.alive_at = time.time()
+        if self.on_listen is not None:
+            self.on_listen(previous_alive_at)
 
     @abstractmethod
     def publish(self, event: Event) -> None:
         raise NotImplementedError
 
+    def publish_many(self, events: list[Event]) -> None:
+        for event in events:
+            self.publish(event)
+
+    def persist_and_publish(self, event: Event, private_data: dict | None = None) -> None:
+        """Store the event (when storage is enabled) and publish it."""
+        started = metrics.start()
+        event.persist(private_data=private_data)
+        metrics.PUBLISH_SECONDS.observe_since(started, phase='persist')
+        started = metrics.start()
+        self.publish(event)
+        metrics.PUBLISH_SECONDS.observe_since(started, phase='notify')
+
+    def persist_and_publish_many(
+            self,
+            events: list[Event],
+            private_data: dict | None = None
+    ) -> None:
+        """Store the events with one bulk insert (when storage is enabled) and publish them."""
+        started = metrics.start()
+        Event.persist_many(events, private_data=private_data)
+        metrics.PUBLISH_SECONDS.observe_since(started, phase='persist')
+        started = metrics.start()
+        self.publish_many(events)
+        metrics.PUBLISH_SECONDS.observe_since(started, phase='notify')
+
+    async def apublish(self, event: Event) -> None:
+        """Async publish. Backends should override this to avoid the thread hop."""
+        await sync_to_async(self.publish)(event)
+
+    async def apersist_and_publish(self, event: Event, private_data: dict | None = None) -> None:
+        """Async version of persist_and_publish, storing with the async ORM."""
+        started = metrics.start()
+        await event.apersist(private_data=private_data)
+        metrics.PUBLISH_SECONDS.observe_since(started, phase='persist')
+        started = metrics.start()
+        await self.apublish(event)
+        metrics.PUBLISH_SECONDS.observe_since(started, phase='notify')
+
     @abstractmethod
     def listen(self, channel: str) -> Generator[str, None, None]:
         raise NotImplementedError
+
+    async def alisten(self, channel: str) -> AsyncGenerator[str, None]:
+        """Async version of listen, used by AsyncListener."""
+        raise NotImplementedError
+        yield  # pragma: no cover
@@ -0,0 +1,84 @@
+import asyncio
+import contextlib
+import copy
+import queue
+import threading
+from collections.abc import AsyncGenerator, Callable, Generator
+
+from django.db import transaction
+
+from ..structs import Event
+from .base import BaseRealtimeBackend
+
+
+class MemoryBackend(BaseRealtimeBackend):
+    """
+    In-process backend for single-node deployments and tests.
+
+    Published events are handed straight to the listeners of this process, without
+    serialization, NOTIFY or a LISTEN connection. Like NOTIFY, sync publishes inside a
+    transaction are delivered on commit. Each listener gets its own copy of the event.
+    Events are not shared between processes, use the PostgreSQL backend for that.
+    """
+
+    # Channel name -> delivery callbacks of the listeners in this process
+    _subscribers: dict[str, list[Callable[[Event], None]]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.channel_name = options.get('channel', 'djangorealtime')
+        self.database = options.get('database', 'default')
+
+    def publish(self, event: Event) -> None:
+        transaction.on_commit(lambda: self._deliver([event]), using=self.database)
+
+    def publish_many(self, events: list[Event]) -> None:
+        events = list(events)
+        transaction.on_commit(lambda: self._deliver(events), using=self.database)
+
+    async def apublish(self, event: Event) -> None:
+        """Async publishes are stored in autocommit mode, so deliver right away"""
+        self._deliver([event])
+
+    def _deliver(self, events: list[Event]):
+        for subscriber in tuple(self._subscribers.get(self.channel_name, ())):
+            for event in events:
+                subscriber(copy.deepcopy(event))
+
+    def _subscribe(self, callback: Callable[[Event], None]):
+        with self._lock:
+            self._subscribers.setdefault(self.channel_name, []).append(callback)
+
+    def _unsubscribe(self, callback: Callable[[Event], None]):
+        with self._lock:
+            subscribers = self._subscribers.get(self.channel_name, [])
+            if callback in subscribers:
+                subscribers.remove(callback)
+
+    def listen(self, channel: str) -> Generator[Event, None, None]:
+        events = queue.SimpleQueue()
+        self._subscribe(events.put)
+        self.listening()
+        try:
+            while True:
+                yield events.get()
+        finally:
+            self._unsubscribe(events.put)
+
+    async def alisten(self, channel: str) -> AsyncGenerator[Event, None]:
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def put(event):
+            # The loop may be closed without this generator being closed
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(events.put_nowait, event)
+
+        self._subscribe(put)
+        self.listening()
+        try:
+            while True:
+                yield await events.get()
+        finally:
+            self._unsubscribe(put)
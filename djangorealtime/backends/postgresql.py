@@ -1,32 +1,247 @@
-from collections.abc import Generator
+import asyncio
+import contextlib
+import json
+import time
+import weakref
+from collections.abc import AsyncGenerator, Generator
+from functools import cache
 
-from django.db import connection
+import psycopg
+from django.db import connection, connections
+from psycopg.conninfo import conninfo_to_dict
 
-from ..retry import retry_generator
-from ..structs import Event
-from ..utils import logger
+from .. import codecs, metrics, spillover
+from ..config import Config
+from ..retry import retry_async_generator, retry_generator
+from ..structs import Event, Scope, Status
+from ..utils import get_event_model, logger
 from .base import BaseRealtimeBackend
 
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 8000
+
+# TCP keepalives for the LISTEN connection, so dead peers are detected within about a minute
+LISTEN_KEEPALIVES = {
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 3,
+}
+
+
+def batch_payloads(payloads: list[str], limit: int = NOTIFY_PAYLOAD_LIMIT) -> list[str]:
+    """
+    Pack event payloads into as few NOTIFY payloads as possible.
+    Several events are joined by the codec (a JSON array for JSON), a lone event is sent as is.
+    """
+    batches = []
+    current = []
+    size = 2  # Brackets of the JSON array
+
+    for payload in payloads:
+        payload_size = len(payload.encode()) + 1  # Separating comma
+        if current and size + payload_size >= limit:
+            batches.append(codecs.join(current))
+            current = []
+            size = 2
+        current.append(payload)
+        size += payload_size
+
+    if current:
+        batches.append(codecs.join(current))
+    return batches
+
+
+def notify_payload(event: Event) -> str:
+    """The event's NOTIFY payload, or a reference to the stored event if it's over the limit"""
+    payload = event.to_payload()
+    # UTF-8 takes at most 4 bytes per character, only encode payloads that may be over
+    if len(payload) * 4 >= NOTIFY_PAYLOAD_LIMIT and len(payload.encode()) >= NOTIFY_PAYLOAD_LIMIT:
+        return spillover.reference_payload(event)
+    return payload
+
+
+class _AsyncConnections:
+    """
+    Autocommit connections of one event loop for the async API. Up to `size` publishes run
+    concurrently, each on its own connection, and connections are reused once released.
+    """
+
+    def __init__(self, params: dict, size: int):
+        self._params = params
+        self._idle: list[psycopg.AsyncConnection] = []
+        self._opened: set[psycopg.AsyncConnection] = set()
+        self._slots = asyncio.Semaphore(size)
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            if conn is None or conn.closed:
+                self._opened.discard(conn)
+                conn = await psycopg.AsyncConnection.connect(**self._params, autocommit=True)
+                self._opened.add(conn)
+            try:
+                yield conn
+            except psycopg.OperationalError:
+                # Drop the broken connection, the next call reconnects
+                self._opened.discard(conn)
+                await conn.close()
+                raise
+            finally:
+                if not conn.closed:
+                    self._idle.append(conn)
+
+    def close(self):
+        """Close the connections without the loop, it may be closed already"""
+        for conn in self._opened:
+            conn.pgconn.finish()
+        self._opened.clear()
+        self._idle.clear()
+
+    def __len__(self):
+        return len(self._opened)
+
+
+@cache
+def _persist_and_notify_sql(model) -> str:
+    """INSERT the event row and NOTIFY in a single statement."""
+    quote = connection.ops.quote_name
+    fields = ['id', 'type', 'scope', 'detail', 'user_id', 'status', 'data_store']
+    columns = [quote(model._meta.get_field(name).column) for name in fields]
+    columns += [quote(model._meta.get_field(name).column) for name in ('created_at', 'updated_at')]
+    return (
+        f"WITH inserted AS ("
+        f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(columns)}) "
+        f"VALUES (%s, %s, %s, %s::jsonb, %s, %s, %s::jsonb, now(), now()) RETURNING 1"
+        f") SELECT pg_notify(%s, %s) FROM inserted;"
+    )
+
 
 class PostgreSqlBackend(BaseRealtimeBackend):
     def __init__(self, **options):
         super().__init__(**options)
         self.channel_name = options.get('channel', 'djangorealtime')
+        self.database = options.get('database', 'default')
         self._connection = None
+        # Autocommit connections per event loop for the async API
+        self._async_connections = weakref.WeakKeyDictionary()
 
     def connect(self) -> None:
+        """
+        Open the dedicated LISTEN connection. It is a raw psycopg connection outside Django's
+        connection handling, so `default` can point at a transaction-mode pooler like PgBouncer.
+        """
         # Close any existing broken connection
-        connection.close()
+        if self._connection is not None:
+            self._connection.close()
+
+        self._connection = psycopg.connect(**self.listen_connection_params(), autocommit=True)
+
+    def connection_params(self, database: str | None = None) -> dict:
+        """psycopg connection parameters of a Django database (the backend's by default)."""
+        params = connections[database or self.database].get_connection_params()
+        params.pop('cursor_factory', None)
+        return params
 
-        connection.ensure_connection()
-        self._connection = connection.connection
+    def listen_connection_params(self) -> dict:
+        """
+        Connection parameters for LISTEN: LISTEN_DSN if set, else the LISTEN_DATABASE alias.
+        TCP keepalives are on unless the DSN or database OPTIONS set them.
+        """
+        if Config.LISTEN_DSN:
+            params = conninfo_to_dict(Config.LISTEN_DSN)
+        else:
+            params = self.connection_params(Config.LISTEN_DATABASE)
+        return {**LISTEN_KEEPALIVES, **params}
+
+    def _async_pool(self) -> _AsyncConnections:
+        """This loop's connections. Created without awaiting, so concurrent callers share it."""
+        loop = asyncio.get_running_loop()
+        pool = self._async_connections.get(loop)
+        if pool is None:
+            # Close the connections of loops that are gone
+            for other, other_pool in list(self._async_connections.items()):
+                if other.is_closed():
+                    other_pool.close()
+                    self._async_connections.pop(other, None)
+            pool = _AsyncConnections(self.connection_params(), Config.ASYNC_PUBLISH_CONNECTIONS)
+            self._async_connections[loop] = pool
+            weakref.finalize(loop, pool.close)
+        return pool
+
+    async def _aexecute(self, sql: str, params: list) -> None:
+        async with self._async_pool().connection() as conn:
+            await conn.execute(sql, params)
 
     def publish(self, event: Event) -> None:
         with connection.cursor() as cursor:
             cursor.execute(
                 "SELECT pg_notify(%s, %s);",
-                [self.channel_name, event.to_json()]
+                [self.channel_name, notify_payload(event)]
+            )
+
+    def publish_many(self, events: list[Event]) -> None:
+        """Publish many events with as few NOTIFY payloads as possible, in one statement."""
+        payloads = batch_payloads([notify_payload(event) for event in events])
+        if not payloads:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload;",
+                [self.channel_name, payloads]
+            )
+
+    def persist_and_publish(self, event: Event, private_data: dict | None = None) -> None:
+        """
+        Store and publish the event in one round-trip.
+        Falls back to ORM create + NOTIFY when ORM_PUBLISH is enabled (model save signals etc.).
+        """
+        if Config.ORM_PUBLISH or event.skip_storage or not Config.ENABLE_EVENT_STORAGE:
+            return super().persist_and_publish(event, private_data=private_data)
+
+        started = metrics.start()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _persist_and_notify_sql(get_event_model()),
+                self._persist_and_notify_params(event, private_data)
             )
+        metrics.PUBLISH_SECONDS.observe_since(started, phase='persist_notify')
+
+    async def apublish(self, event: Event) -> None:
+        """Publish from async code on this loop's own connection, without a thread hop."""
+        await self._aexecute(
+            "SELECT pg_notify(%s, %s);", [self.channel_name, notify_payload(event)]
+        )
+
+    async def apersist_and_publish(self, event: Event, private_data: dict | None = None) -> None:
+        """
+        Async version of persist_and_publish.
+        Runs on an autocommit connection, so it is not part of any Django transaction.
+        """
+        if Config.ORM_PUBLISH or event.skip_storage or not Config.ENABLE_EVENT_STORAGE:
+            return await super().apersist_and_publish(event, private_data=private_data)
+
+        started = metrics.start()
+        await self._aexecute(
+            _persist_and_notify_sql(get_event_model()),
+            self._persist_and_notify_params(event, private_data)
+        )
+        metrics.PUBLISH_SECONDS.observe_since(started, phase='persist_notify')
+
+    def _persist_and_notify_params(self, event: Event, private_data: dict | None) -> list:
+        data_store = {'private_data': private_data} if private_data else {}
+        return [
+            event.id,
+            event.type,
+            Scope(event.scope).value,
+            json.dumps(event.detail),
+            event.user_id,
+            Status.NEW.value,
+            json.dumps(data_store),
+            self.channel_name,
+            notify_payload(event),
+        ]
 
     @retry_generator(delay=1, max_delay=60, backoff=2)
     def listen(self, channel: str) -> Generator[str, None, None]:
@@ -37,11 +252,31 @@ class PostgreSqlBackend(BaseRealtimeBackend):
             cursor.execute(f"LISTEN {self.channel_name};")
 
         logger.info(f"Listening on channel: {self.channel_name}")
+        self.listening()
 
-        for notify in self._connection.notifies():
-            yield notify.payload
+        while True:
+            for notify in self._connection.notifies(timeout=Config.LISTEN_HEALTHCHECK_INTERVAL):
+                self.alive_at = time.time()
+                yield notify.payload
+            # Idle for a while, check the connection is alive. Raises to trigger retry.
+            self._connection.execute("SELECT 1;")
+            self.alive_at = time.time()
 
-        # Connection closed - raise to trigger retry
-        logger.error("PostgreSQL connection closed, reconnecting...")
-        self._connection = None
-        raise ConnectionError("PostgreSQL connection closed unexpectedly")
+    @retry_async_generator(delay=1, max_delay=60, backoff=2)
+    async def alisten(self, channel: str) -> AsyncGenerator[str, None]:
+        logger.info(f"Connecting to PostgreSQL channel (async): {self.channel_name}")
+        params = self.listen_connection_params()
+        conn = await psycopg.AsyncConnection.connect(**params, autocommit=True)
+
+        async with conn:
+            await conn.execute(f"LISTEN {self.channel_name};")
+            logger.info(f"Listening on channel (async): {self.channel_name}")
+            self.listening()
+
+            while True:
+                async for notify in conn.notifies(timeout=Config.LISTEN_HEALTHCHECK_INTERVAL):
+                    self.alive_at = time.time()
+                    yield notify.payload
+                # Idle for a while, check the connection is alive. Raises to trigger retry.
+                await conn.execute("SELECT 1;")
+                self.alive_at = time.time()
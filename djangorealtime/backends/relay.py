@@ -0,0 +1,235 @@
+import asyncio
+import contextlib
+import fcntl
+import os
+import socket
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, Callable, Generator
+
+from ..config import Config
+from ..retry import retry_async_generator, retry_generator
+from ..utils import logger
+from .postgresql import PostgreSqlBackend
+
+# Sent by the relay when it re-established LISTEN, so workers catch up on missed events.
+# Payloads start with '{' or '[' (JSON) or 'm' (msgpack), never with '!'.
+RELAY_LISTENING = '!listening'
+
+# A worker that doesn't read its socket for this long is dropped, it reconnects and catches up
+RELAY_SEND_TIMEOUT = 5
+
+# Bytes waiting for a worker before it's dropped, so a stalled worker never holds up the others
+RELAY_CLIENT_BUFFER = 1024 * 1024
+
+# Pause after a failed accept(), e.g. out of file descriptors, before accepting again
+RELAY_ACCEPT_BACKOFF = 0.5
+
+
+class _RelayClient:
+    """
+    A worker's connection to the relay. Lines are buffered and written by the client's own
+    thread, so a slow worker doesn't delay the others. It's closed once its buffer is full.
+    """
+
+    def __init__(self, sock: socket.socket, on_close: Callable[['_RelayClient'], None]):
+        self.sock = sock
+        self._on_close = on_close
+        self._buffer = deque()
+        self._buffered = 0
+        self._closed = False
+        self._ready = threading.Condition()
+        threading.Thread(target=self._write, daemon=True).start()
+
+    def send(self, data: bytes):
+        with self._ready:
+            if self._closed:
+                return
+            if self._buffered + len(data) > RELAY_CLIENT_BUFFER:
+                logger.warning("Dropping relay client: it isn't reading its socket")
+                self._close()
+                return
+            self._buffer.append(data)
+            self._buffered += len(data)
+            self._ready.notify()
+
+    def _write(self):
+        while True:
+            with self._ready:
+                self._ready.wait_for(lambda: self._buffer or self._closed)
+                if self._closed:
+                    break
+                data = b''.join(self._buffer)
+                self._buffer.clear()
+                self._buffered = 0
+            try:
+                self.sock.sendall(data)
+            except OSError as e:
+                logger.warning(f"Dropping relay client: {e}")
+                with self._ready:
+                    self._close()
+                break
+        self.sock.close()
+
+    def _close(self):
+        """Called with the lock held. The writer thread closes the socket."""
+        if self._closed:
+            return
+        self._closed = True
+        self._buffer.clear()
+        self._ready.notify()
+        with contextlib.suppress(OSError):
+            self.sock.shutdown(socket.SHUT_RDWR)  # Wakes a writer blocked in sendall()
+        self._on_close(self)
+
+
+class Relay:
+    """
+    Holds the host's single LISTEN connection and re-broadcasts raw NOTIFY payloads,
+    one per line, to the workers connected to its Unix socket.
+
+    Only one relay per socket path runs at a time, guarded by an flock on `<socket>.lock`.
+    Run it with `manage.py djr_relay`, or let RelayBackend workers elect one among themselves.
+    """
+
+    def __init__(self, socket_path: str, **backend_options):
+        self.socket_path = socket_path
+        self.backend = PostgreSqlBackend(**backend_options)
+        self.backend.on_listen = self._on_listen
+        self._clients: set[_RelayClient] = set()
+        self._clients_lock = threading.Lock()
+        self._lock_file = None
+        self._server = None
+
+    def acquire(self) -> bool:
+        """Take the relay lock and bind the socket. Returns False if another relay runs."""
+        lock_file = open(f'{self.socket_path}.lock', 'a')  # noqa: SIM115, held while relaying
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+
+        self._lock_file = lock_file
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)  # Left over by a relay that died
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        self._server.listen()
+        return True
+
+    def start(self):
+        """Relay from background threads, after acquire()"""
+        threading.Thread(target=self._accept, daemon=True).start()
+        threading.Thread(target=self._relay, daemon=True).start()
+
+    def serve_forever(self):
+        """Relay in the current thread, after acquire()"""
+        threading.Thread(target=self._accept, daemon=True).start()
+        self._relay()
+
+    def broadcast(self, line: str):
+        data = f'{line}\n'.encode()
+        with self._clients_lock:
+            clients = tuple(self._clients)
+        for client in clients:
+            client.send(data)
+
+    def __len__(self):
+        return len(self._clients)
+
+    def _discard(self, client: _RelayClient):
+        with self._clients_lock:
+            self._clients.discard(client)
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._server.accept()
+            except OSError as e:
+                # Keep accepting, workers that can't connect never get events
+                logger.error(f"Relay failed to accept a worker: {e}")
+                time.sleep(RELAY_ACCEPT_BACKOFF)
+                continue
+            sock.settimeout(RELAY_SEND_TIMEOUT)
+            with self._clients_lock:
+                self._clients.add(_RelayClient(sock, on_close=self._discard))
+
+    def _relay(self):
+        logger.info(f"Relaying PostgreSQL notifications on {self.socket_path}")
+        for payload in self.backend.listen('djangorealtime'):
+            self.broadcast(payload)
+
+    def _on_listen(self, alive_at):
+        if alive_at is not None:
+            self.broadcast(RELAY_LISTENING)
+
+
+class RelayBackend(PostgreSqlBackend):
+    """
+    PostgreSQL backend that receives notifications from the host's Relay over a Unix socket,
+    instead of holding a LISTEN connection per worker. Publishing is unchanged.
+
+    If no relay is running and RELAY_ELECT is enabled, the first worker to take the relay
+    lock runs it in background threads. When that worker exits, the others reconnect and
+    one of them takes over.
+    """
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.socket_path = options.get('socket', Config.RELAY_SOCKET)
+
+    def _connect_relay(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if not Config.RELAY_ELECT:
+                raise
+            self._elect()
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+        return sock
+
+    def _elect(self):
+        relay = Relay(self.socket_path, **self.options)
+        if relay.acquire():
+            logger.info(f"Elected as relay for {self.socket_path}")
+            relay.start()
+
+    def _receive(self, line: str) -> str | None:
+        """The payload of a relayed line, None for control lines"""
+        if line == RELAY_LISTENING:
+            self.listening()
+            return None
+        self.alive_at = time.time()
+        return line
+
+    @retry_generator(delay=1, max_delay=60, backoff=2)
+    def listen(self, channel: str) -> Generator[str, None, None]:
+        logger.info(f"Connecting to relay: {self.socket_path}")
+        with self._connect_relay() as sock, sock.makefile('r', encoding='utf-8') as lines:
+            self.listening()
+            for line in lines:
+                payload = self._receive(line.rstrip('\n'))
+                if payload is not None:
+                    yield payload
+        raise ConnectionError("Relay closed the connection")
+
+    @retry_async_generator(delay=1, max_delay=60, backoff=2)
+    async def alisten(self, channel: str) -> AsyncGenerator[str, None]:
+        logger.info(f"Connecting to relay (async): {self.socket_path}")
+        sock = await asyncio.to_thread(self._connect_relay)
+        reader, writer = await asyncio.open_unix_connection(sock=sock)
+        try:
+            self.listening()
+            while line := await reader.readline():
+                payload = self._receive(line.decode().rstrip('\n'))
+                if payload is not None:
+                    yield payload
+        finally:
+            writer.close()
+        raise ConnectionError("Relay closed the connection")
@@ -14,9 +14,16 @@ def get_backend():
 
     if isinstance(backend_config, dict):
         backend_path = backend_config['CLASS']
-        options = backend_config.get('OPTIONS', {})
         backend_class = import_string(backend_path)
-        return backend_class(**options)
+        return backend_class(**get_backend_options())
 
     backend_class = import_string(backend_config)
     return backend_class()
+
+
+def get_backend_options() -> dict:
+    """OPTIONS of the DJANGOREALTIME['BACKEND'] setting, empty if it's a class path"""
+    backend_config = Config.BACKEND
+    if isinstance(backend_config, dict):
+        return dict(backend_config.get('OPTIONS', {}))
+    return {}
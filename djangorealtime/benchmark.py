@@ -0,0 +1,292 @@
+"""
+End-to-end load benchmark: in-process SSE clients on `sse_view`, publishing through the backend.
+
+Events are published with `apublish`/`apublish_global` at a fixed rate and carry their publish
+time, so each client measures publish-to-stream latency. Events reach the clients through the
+threaded or the async listener, LISTENER_MODE by default. Used by the `djr_benchmark` command
+and `tests/benchmarks/bench_end_to_end.py`. Needs a running PostgreSQL.
+"""
+import asyncio
+import contextlib
+import json
+import random
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from types import SimpleNamespace
+
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+
+from .activity import activity_writer
+from .config import Config
+from .listener import AsyncListener, Listener
+from .publisher import _get_backend, apublish, apublish_global
+from .thread_pool import run_in_thread
+
+EVENT_TYPE = 'djr_benchmark'
+LISTENER_MODES = ('thread', 'async')
+
+_thread_listener = None
+
+
+@dataclass
+class BenchmarkResult:
+    clients: int
+    users: int
+    rate: float
+    duration: float
+    user_ratio: float
+    storage: bool
+    hook: bool
+    listener: str  # thread or async
+    published: int = 0
+    publish_rate: float = 0.0  # Achieved, lower than rate when publishing can't keep up
+    expected_deliveries: int = 0
+    delivered: int = 0
+    throughput: float = 0.0  # Deliveries per second
+    latency_ms: dict = field(default_factory=dict)  # Publish to SSE stream
+    publish_ms: dict = field(default_factory=dict)  # apublish call
+    memory_per_connection: int = 0  # Bytes allocated per open stream
+    db_queries: int = 0  # Statements on Django connections and the backend's async connections
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def at(q):
+        return round(values[min(int(q * len(values)), len(values) - 1)], 3)
+
+    return {'p50': at(0.5), 'p99': at(0.99), 'p999': at(0.999), 'max': round(values[-1], 3)}
+
+
+class _QueryCounter:
+    """
+    execute_wrapper counting statements on every Django connection opened meanwhile, and
+    on the publish backend's own async connections (the single statement insert and NOTIFY)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def _count_backend(self, aexecute):
+        async def counted(sql, params):
+            with self._lock:
+                self.count += 1
+            return await aexecute(sql, params)
+
+        return counted
+
+    @contextlib.contextmanager
+    def installed(self):
+        backend = _get_backend()
+        aexecute = getattr(backend, '_aexecute', None)
+        if aexecute is not None:
+            backend._aexecute = self._count_backend(aexecute)
+        connection_created.connect(self._on_connection_created, weak=False)
+        try:
+            yield self
+        finally:
+            connection_created.disconnect(self._on_connection_created)
+            if aexecute is not None:
+                del backend._aexecute  # Back to the class method
+
+
+@contextlib.contextmanager
+def _override_config(**values):
+    previous = {name: getattr(Config, name) for name in values}
+    for name, value in values.items():
+        setattr(Config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(Config, name, value)
+
+
+def _bench_hook(event, request):
+    return event
+
+
+def _start_thread_listener():
+    """Threaded listener, started once per process like the app does under ASGI"""
+    global _thread_listener
+    if _thread_listener is None:
+        _thread_listener = Listener()
+        _thread_listener.start()
+
+
+class Benchmark:
+    def __init__(self, result: BenchmarkResult, seed: int = 0):
+        self.result = result
+        self.random = random.Random(seed)
+        self.user_ids = [f'bench-{i}' for i in range(result.users)]
+        self.clients_per_user = dict.fromkeys(self.user_ids, 0)
+        self.latencies = []
+        self.publish_latencies = []
+        self.connected = 0
+        self.first_published_at = None
+        self.last_received_at = None
+        self._publishing_done = False
+        self._all_connected = asyncio.Event()
+        self._all_delivered = asyncio.Event()
+
+    async def _client(self, user_id: str):
+        from .views import sse_view
+
+        request = RequestFactory().get('/realtime/sse/')
+        request.user = SimpleNamespace(pk=user_id)
+        response = await sse_view(request)
+        seen = set()
+        async for chunk in response.streaming_content:
+            message = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if not message.startswith('id: '):
+                if '"connected"' in message:
+                    self.connected += 1
+                    if self.connected == self.result.clients:
+                        self._all_connected.set()
+                continue
+
+            event_id, data = message.split('\n', 2)[:2]
+            if event_id in seen:
+                continue  # Delivered twice, e.g. by another listener in this process
+            seen.add(event_id)
+            data = json.loads(data.removeprefix('data: '))
+            if data.get('type') != EVENT_TYPE:
+                continue
+            now = time.perf_counter()
+            self.latencies.append((now - data['sent_at']) * 1000)
+            self.last_received_at = now
+            self.result.delivered += 1
+            if self.result.delivered >= self.result.expected_deliveries and self._publishing_done:
+                self._all_delivered.set()
+
+    async def _publish(self):
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.result.rate
+        end = loop.time() + self.result.duration
+        next_at = loop.time()
+        n = 0
+        while loop.time() < end:
+            started = time.perf_counter()
+            self.first_published_at = self.first_published_at or started
+            detail = {'sent_at': started, 'n': n}
+            if self.random.random() < self.result.user_ratio:
+                user_id = self.random.choice(self.user_ids)
+                self.result.expected_deliveries += self.clients_per_user[user_id]
+                await apublish(user_id, EVENT_TYPE, detail)
+            else:
+                self.result.expected_deliveries += self.result.clients
+                await apublish_global(EVENT_TYPE, detail)
+            self.publish_latencies.append((time.perf_counter() - started) * 1000)
+            n += 1
+
+            next_at += interval
+            await asyncio.sleep(max(next_at - loop.time(), 0))
+        self.result.published = n
+        self.result.publish_rate = round(n / self.result.duration, 1)
+
+    async def run(self, drain_timeout: float = 10) -> BenchmarkResult:
+        if self.result.listener == 'async':
+            AsyncListener.ensure_started()
+        else:
+            _start_thread_listener()
+        await asyncio.sleep(0.2)  # Let the listener connect
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tasks = []
+        for i in range(self.result.clients):
+            user_id = self.user_ids[i % len(self.user_ids)]
+            self.clients_per_user[user_id] += 1
+            tasks.append(asyncio.create_task(self._client(user_id)))
+        await asyncio.wait_for(self._all_connected.wait(), timeout=30)
+        allocated = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        self.result.memory_per_connection = allocated // max(self.result.clients, 1)
+
+        await self._publish()
+        self._publishing_done = True
+        if self.result.delivered >= self.result.expected_deliveries:
+            self._all_delivered.set()
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._all_delivered.wait(), timeout=drain_timeout)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.last_received_at and self.first_published_at:
+            elapsed = self.last_received_at - self.first_published_at
+            self.result.throughput = round(self.result.delivered / elapsed, 1)
+        self.result.latency_ms = percentiles(self.latencies)
+        self.result.publish_ms = percentiles(self.publish_latencies)
+        return self.result
+
+
+async def run_benchmark(
+        clients: int = 100,
+        rate: float = 100,
+        duration: float = 5,
+        user_ratio: float = 0.5,
+        users: int | None = None,
+        storage: bool = True,
+        hook: bool = False,
+        listener: str | None = None,
+        seed: int = 0,
+) -> BenchmarkResult:
+    """
+    Run the benchmark on the running event loop.
+
+    Args:
+        clients: Concurrent SSE clients
+        rate: Events published per second
+        duration: Seconds of publishing
+        user_ratio: Share of user events, the rest are global
+        users: Distinct users the clients are spread over (default: one per client)
+        storage: Store events (ENABLE_EVENT_STORAGE)
+        hook: Install a pass-through BEFORE_SEND_HOOK, to measure the hook path
+        listener: thread or async listener (default: LISTENER_MODE)
+        seed: Seed for picking scopes and users
+    """
+    listener = listener or Config.LISTENER_MODE
+    if listener not in LISTENER_MODES:
+        raise ValueError(f"Unknown listener mode: {listener}")
+    result = BenchmarkResult(
+        clients=clients,
+        users=users or clients,
+        rate=rate,
+        duration=duration,
+        user_ratio=user_ratio,
+        storage=storage,
+        hook=hook,
+        listener=listener,
+    )
+    overrides = {
+        'ENABLE_EVENT_STORAGE': storage,
+        'BEFORE_SEND_HOOK': _bench_hook if hook else None,
+        'LISTENER_MODE': listener,  # So sse_view doesn't start an async listener in thread mode
+    }
+    counter = _QueryCounter()
+    with _override_config(**overrides), counter.installed():
+        await Benchmark(result, seed=seed).run()
+        # Count the activity writes of this run too
+        await run_in_thread(activity_writer.flush)
+    result.db_queries = counter.count
+    return result
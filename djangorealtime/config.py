@@ -7,7 +7,9 @@ Example in settings.py:
     DJANGOREALTIME = {
         'BACKEND': 'djangorealtime.backends.postgresql.PostgreSqlBackend',
         'AUTO_LISTEN': True,
+        'LISTENER_MODE': 'thread',
         'ENABLE_EVENT_STORAGE': True,
+        'ORM_PUBLISH': False,
         'EVENT_MODEL': 'djangorealtime.Event',
         'ON_RECEIVE_HOOK': callable,
         'BEFORE_SEND_HOOK': callable,
@@ -23,13 +25,50 @@ class Config:
     # Default values
     BACKEND = None
     AUTO_LISTEN = True
+    LISTENER_MODE = 'thread'
+    LISTEN_DSN = None
+    LISTEN_DATABASE = 'default'
+    LISTEN_HEALTHCHECK_INTERVAL = 30
+    RELAY_SOCKET = '/tmp/djangorealtime.sock'
+    RELAY_ELECT = True
+    LISTENER_CATCHUP = True
+    LISTENER_CATCHUP_WINDOW = 300
+    LISTENER_CATCHUP_LIMIT = 10000
     ENABLE_EVENT_STORAGE = True
+    ORM_PUBLISH = False
+    ASYNC_PUBLISH_CONNECTIONS = 4
     EVENT_MODEL = 'djangorealtime.Event'
     ON_RECEIVE_HOOK = None
     BEFORE_SEND_HOOK = None
     CONCURRENT_SSE_WORKERS = 1
     CLOSE_DB_PER_EVENT = True
     HEARTBEAT_INTERVAL = 5
+    SSE_QUEUE_SIZE = 100
+    SSE_OVERFLOW_POLICY = 'drop_newest'
+    CONFLATE_EVENT_TYPES = ()
+    METRICS_ENABLED = False
+    CODEC = 'json'
+    SPILLOVER_CACHE_SIZE = 1000
+    SPILLOVER_CACHE_TTL = 30
+    SSE_CODEC = 'json'
+    PUBLISH_DEBOUNCE = {}
+    SSE_REPLAY_WINDOW = 300
+    SSE_REPLAY_LIMIT = 1000
+    ACTIVITY_FLUSH_INTERVAL = 0.5
+    ACTIVITY_BATCH_SIZE = 500
+    ACTIVITY_BUFFER_SIZE = 10000
+    ACTIVITY_FLUSH_ON_SHUTDOWN = True
+    ACTIVITY_MODE = 'full'
+    ACTIVITY_MODE_BY_SCOPE = {}
+    ACTIVITY_MODE_BY_TYPE = {}
+    PARTITION_INTERVAL = 'month'
+    PARTITION_PREMAKE = 2
+    PARTITION_RETENTION_DAYS = None
+    RETENTION_DAYS = None
+    RETENTION_BY_TYPE = {}
+    RETENTION_BY_SCOPE = {}
+    PRUNE_BATCH_SIZE = 1000
+    PRUNE_SLEEP = 0.1
 
     @classmethod
     def load(cls):
@@ -38,10 +77,47 @@ class Config:
 
         cls.BACKEND = config_dict.get('BACKEND', None)
         cls.AUTO_LISTEN = config_dict.get('AUTO_LISTEN', True)
+        cls.LISTENER_MODE = config_dict.get('LISTENER_MODE', 'thread')
+        cls.LISTEN_DSN = config_dict.get('LISTEN_DSN', None)
+        cls.LISTEN_DATABASE = config_dict.get('LISTEN_DATABASE', 'default')
+        cls.LISTEN_HEALTHCHECK_INTERVAL = config_dict.get('LISTEN_HEALTHCHECK_INTERVAL', 30)
+        cls.RELAY_SOCKET = config_dict.get('RELAY_SOCKET', '/tmp/djangorealtime.sock')
+        cls.RELAY_ELECT = config_dict.get('RELAY_ELECT', True)
+        cls.LISTENER_CATCHUP = config_dict.get('LISTENER_CATCHUP', True)
+        cls.LISTENER_CATCHUP_WINDOW = config_dict.get('LISTENER_CATCHUP_WINDOW', 300)
+        cls.LISTENER_CATCHUP_LIMIT = config_dict.get('LISTENER_CATCHUP_LIMIT', 10000)
         cls.ENABLE_EVENT_STORAGE = config_dict.get('ENABLE_EVENT_STORAGE', True)
+        cls.ORM_PUBLISH = config_dict.get('ORM_PUBLISH', False)
+        cls.ASYNC_PUBLISH_CONNECTIONS = config_dict.get('ASYNC_PUBLISH_CONNECTIONS', 4)
         cls.EVENT_MODEL = config_dict.get('EVENT_MODEL', 'djangorealtime.Event')
         cls.ON_RECEIVE_HOOK = config_dict.get('ON_RECEIVE_HOOK', None)
         cls.BEFORE_SEND_HOOK = config_dict.get('BEFORE_SEND_HOOK', None)
         cls.CONCURRENT_SSE_WORKERS = config_dict.get('CONCURRENT_SSE_WORKERS', 1)
         cls.CLOSE_DB_PER_EVENT = config_dict.get('CLOSE_DB_PER_EVENT', True)
         cls.HEARTBEAT_INTERVAL = config_dict.get('HEARTBEAT_INTERVAL', 5)
+        cls.SSE_QUEUE_SIZE = config_dict.get('SSE_QUEUE_SIZE', 100)
+        cls.SSE_OVERFLOW_POLICY = config_dict.get('SSE_OVERFLOW_POLICY', 'drop_newest')
+        cls.CONFLATE_EVENT_TYPES = frozenset(config_dict.get('CONFLATE_EVENT_TYPES', ()))
+        cls.PUBLISH_DEBOUNCE = config_dict.get('PUBLISH_DEBOUNCE', {})
+        cls.METRICS_ENABLED = config_dict.get('METRICS_ENABLED', False)
+        cls.CODEC = config_dict.get('CODEC', 'json')
+        cls.SPILLOVER_CACHE_SIZE = config_dict.get('SPILLOVER_CACHE_SIZE', 1000)
+        cls.SPILLOVER_CACHE_TTL = config_dict.get('SPILLOVER_CACHE_TTL', 30)
+        cls.SSE_CODEC = config_dict.get('SSE_CODEC', 'json')
+        cls.SSE_REPLAY_WINDOW = config_dict.get('SSE_REPLAY_WINDOW', 300)
+        cls.SSE_REPLAY_LIMIT = config_dict.get('SSE_REPLAY_LIMIT', 1000)
+        cls.ACTIVITY_FLUSH_INTERVAL = config_dict.get('ACTIVITY_FLUSH_INTERVAL', 0.5)
+        cls.ACTIVITY_BATCH_SIZE = config_dict.get('ACTIVITY_BATCH_SIZE', 500)
+        cls.ACTIVITY_BUFFER_SIZE = config_dict.get('ACTIVITY_BUFFER_SIZE', 10000)
+        cls.ACTIVITY_FLUSH_ON_SHUTDOWN = config_dict.get('ACTIVITY_FLUSH_ON_SHUTDOWN', True)
+        cls.ACTIVITY_MODE = config_dict.get('ACTIVITY_MODE', 'full')
+        cls.ACTIVITY_MODE_BY_SCOPE = config_dict.get('ACTIVITY_MODE_BY_SCOPE', {})
+        cls.ACTIVITY_MODE_BY_TYPE = config_dict.get('ACTIVITY_MODE_BY_TYPE', {})
+        cls.PARTITION_INTERVAL = config_dict.get('PARTITION_INTERVAL', 'month')
+        cls.PARTITION_PREMAKE = config_dict.get('PARTITION_PREMAKE', 2)
+        cls.PARTITION_RETENTION_DAYS = config_dict.get('PARTITION_RETENTION_DAYS', None)
+        cls.RETENTION_DAYS = config_dict.get('RETENTION_DAYS', None)
+        cls.RETENTION_BY_TYPE = config_dict.get('RETENTION_BY_TYPE', {})
+        cls.RETENTION_BY_SCOPE = config_dict.get('RETENTION_BY_SCOPE', {})
+        cls.PRUNE_BATCH_SIZE = config_dict.get('PRUNE_BATCH_SIZE', 1000)
+        cls.PRUNE_SLEEP = config_dict.get('PRUNE_SLEEP', 0.1)
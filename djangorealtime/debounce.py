@@ -0,0 +1,94 @@
+import atexit
+import threading
+import time
+from collections.abc import Callable
+
+from django.db import connection
+
+from .config import Config
+from .queues import coalesce_key
+from .structs import Event
+from .utils import logger
+
+
+class Debouncer:
+    """
+    Publisher-side debounce for event types in PUBLISH_DEBOUNCE.
+
+    The first event for a type, :id and audience opens a window of the configured seconds.
+    Newer events for the same key replace it, and only the latest is published when the
+    window closes, from a background thread. Events without :id are never debounced.
+    """
+
+    def __init__(self, publish: Callable[[Event, dict | None], None]):
+        self._publish = publish
+        # Key -> (due time, latest event, private data)
+        self._pending: dict[tuple, tuple[float, Event, dict | None]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def window(event: Event) -> float | None:
+        """Debounce window of the event in seconds, None if it is published right away"""
+        window = Config.PUBLISH_DEBOUNCE.get(event.type)
+        if not window or coalesce_key(event) is None:
+            return None
+        return window
+
+    def submit(self, event: Event, private_data: dict | None, window: float):
+        key = (event.scope, event.user_id, *coalesce_key(event))
+        with self._lock:
+            pending = self._pending.get(key)
+            due = pending[0] if pending else time.monotonic() + window
+            self._pending[key] = (due, event, private_data)
+
+        self._ensure_started()
+        if pending is None:
+            self._wakeup.set()
+
+    def flush(self, force: bool = False) -> int:
+        """Publish the events whose window closed, or all of them with force. Returns the count."""
+        now = time.monotonic()
+        with self._lock:
+            due = [key for key, (due_at, _, _) in self._pending.items() if force or due_at <= now]
+            ready = [self._pending.pop(key) for key in due]
+
+        for _, event, private_data in ready:
+            self._publish_safely(event, private_data)
+        return len(ready)
+
+    def _publish_safely(self, event: Event, private_data: dict | None):
+        try:
+            self._publish(event, private_data)
+        except Exception as e:
+            logger.error(f"Error publishing debounced event {event.type}: {e}", exc_info=True)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _next_due(self) -> float | None:
+        with self._lock:
+            return min((due for due, _, _ in self._pending.values()), default=None)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        atexit.register(self.flush, force=True)
+
+    def _run(self):
+        while True:
+            next_due = self._next_due()
+            timeout = None if next_due is None else max(next_due - time.monotonic(), 0)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                if Config.CLOSE_DB_PER_EVENT:
+                    connection.close()
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+import weakref
+
+from .config import Config
+from .queues import RequestQueue, SyncRequestQueue
+
+
+def _tick(queues, now: float):
+    """Put a heartbeat on every stream idle for at least half an interval"""
+    idle_since = now - Config.HEARTBEAT_INTERVAL / 2
+    for queue in queues:
+        if queue.last_sent <= idle_since:
+            queue.heartbeat()
+
+
+class HeartbeatTicker:
+    """
+    One ticker per event loop wakes idle SSE streams in bulk.
+
+    Every HEARTBEAT_INTERVAL it puts a heartbeat on the queue of each registered stream
+    that hasn't sent anything in the last half interval, so streams can block on a plain
+    `queue.get()` instead of a timeout per wakeup. The ticker stops with its last stream.
+    """
+
+    _tickers = weakref.WeakKeyDictionary()  # event loop -> ticker
+
+    def __init__(self):
+        self.queues: set[RequestQueue] = set()
+        self._task = None
+
+    @classmethod
+    def for_loop(cls) -> 'HeartbeatTicker':
+        loop = asyncio.get_running_loop()
+        ticker = cls._tickers.get(loop)
+        if ticker is None:
+            ticker = cls._tickers[loop] = cls()
+        return ticker
+
+    def add(self, queue: RequestQueue):
+        queue.last_sent = asyncio.get_running_loop().time()
+        self.queues.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def discard(self, queue: RequestQueue):
+        self.queues.discard(queue)
+        if not self.queues and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def tick(self):
+        _tick(self.queues, asyncio.get_running_loop().time())
+
+    async def _run(self):
+        while self.queues:
+            await asyncio.sleep(Config.HEARTBEAT_INTERVAL)
+            self.tick()
+
+
+class SyncHeartbeatTicker:
+    """
+    HeartbeatTicker for WSGI streams: one thread per process wakes every idle
+    SyncRequestQueue, whose stream then writes the heartbeat from its own thread.
+    """
+
+    def __init__(self):
+        self.queues: set[SyncRequestQueue] = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, queue: SyncRequestQueue):
+        queue.last_sent = time.monotonic()
+        with self._lock:
+            self.queues.add(queue)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def discard(self, queue: SyncRequestQueue):
+        with self._lock:
+            self.queues.discard(queue)
+
+    def tick(self):
+        with self._lock:
+            queues = tuple(self.queues)
+        _tick(queues, time.monotonic())
+
+    def _run(self):
+        while True:
+            time.sleep(Config.HEARTBEAT_INTERVAL)
+            self.tick()
+
+
+sync_heartbeat = SyncHeartbeatTicker()
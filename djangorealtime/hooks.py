@@ -1,3 +1,4 @@
+from . import metrics
 from .config import Config
 
 
@@ -16,7 +17,9 @@ def execute_on_receive_hook(event):
     if not hook:
         return event
 
+    started = metrics.start()
     result = hook(event)
+    metrics.HOOK_SECONDS.observe_since(started, hook='on_receive')
     if result is False or result is None:
         return None  # Abort
     return result if result else event
@@ -39,7 +42,9 @@ def execute_before_send_hook(event, request):
     if not hook:
         return event
 
+    started = metrics.start()
     result = hook(event, request)
+    metrics.HOOK_SECONDS.observe_since(started, hook='before_send')
     if result is False or result is None:
         return None  # Don't send to this client
     return result if result else event
@@ -1,21 +1,65 @@
+import asyncio
 import threading
+import time
+import weakref
+from collections import deque
 from uuid import uuid4
 
 from django.db import connection
 
+from djangorealtime import codecs, metrics, spillover
 from djangorealtime.backends.utils import get_backend
+from djangorealtime.config import Config
 from djangorealtime.hooks import execute_on_receive_hook
+from djangorealtime.registry import sse_connections
 from djangorealtime.signals import internal_signal
-from djangorealtime.structs import Event
-from djangorealtime.thread_pool import submit_task
-from djangorealtime.utils import logger
+from djangorealtime.structs import Event, Scope
+from djangorealtime.thread_pool import run_in_thread, submit_task
+from djangorealtime.utils import datetime_from_timestamp, get_event_model, logger
+
+# Catch-up starts this many seconds before the connection was last known alive,
+# to cover clock skew between nodes and commit latency
+CATCHUP_MARGIN = 5
+
+
+class RecentIds:
+    """Thread-safe set of the most recent event ids, bounded to maxlen"""
+
+    def __init__(self, maxlen=10000):
+        self.maxlen = maxlen
+        self._ids = set()
+        self._order = deque()
+        self._lock = threading.Lock()
+
+    def add(self, event_id):
+        with self._lock:
+            if event_id in self._ids:
+                return
+            self._ids.add(event_id)
+            self._order.append(event_id)
+            if len(self._order) > self.maxlen:
+                self._ids.discard(self._order.popleft())
+
+    def discard(self, event_id) -> bool:
+        """Remove the id, returns whether it was present"""
+        with self._lock:
+            if event_id not in self._ids:
+                return False
+            self._ids.discard(event_id)
+            return True
+
+    def __contains__(self, event_id):
+        return event_id in self._ids
 
 
 class Listener:
     def __init__(self):
         self.instance_id = uuid4()
         self.backend = get_backend()
+        self.backend.on_listen = self._on_listen
         self._thread = None
+        self._seen = RecentIds()  # Recently dispatched events
+        self._replayed = RecentIds()  # Events dispatched by catch-up, skipped if they arrive live
 
     def start(self):
         """Start listener in a background thread"""
@@ -26,21 +70,218 @@ class Listener:
         logger.info(f"Starting listener: {self.instance_id}")
 
         for payload in self.backend.listen('djangorealtime'):
-            submit_task(self._handle_event, payload)
+            submit_task(self._handle_event, payload, metrics.start())
+
+    @staticmethod
+    def _decode(payload) -> list[Event | spillover.Reference]:
+        """
+        A NOTIFY payload holds one event, or several when batched, in any codec's format.
+        Events over the NOTIFY limit arrive as references, see spillover.resolve().
+        In-process backends hand over the Event itself.
+        """
+        if isinstance(payload, Event):
+            return [payload]
+        data = codecs.decode(payload)
+        if isinstance(data, list):
+            return [spillover.decode_item(item) for item in data]
+        return [spillover.decode_item(data)]
+
+    def _handle_event(self, payload, received_at=None):
+        try:
+            events = self._decode(payload)
+        except Exception as e:
+            logger.error(f"Error decoding event payload: {e}", exc_info=True)
+            return
+
+        metrics.EVENTS_RECEIVED.inc(len(events))
+        events = [event for event in events if not self._replayed.discard(event.id)]
+        self._handle_events(events, received_at)
+
+    def _handle_events(self, events, received_at=None):
+        try:
+            for event in self._resolve(events):
+                self._dispatch(event)
+                metrics.LISTENER_DISPATCH_SECONDS.observe_since(received_at)
+        finally:
+            connection.close()
 
-    def _handle_event(self, payload):
+    @staticmethod
+    def _resolve(events) -> list[Event]:
+        """Fetch the bodies of spilled events, skipping them if that fails"""
         try:
-            event = Event.from_json(payload)
+            return spillover.resolve(events)
+        except Exception as e:
+            logger.error(f"Error fetching spilled events: {e}", exc_info=True)
+            return [event for event in events if isinstance(event, Event)]
+
+    def _on_listen(self, alive_at):
+        """Backend (re)established LISTEN. Replay what was missed since it was last alive."""
+        if alive_at is not None and Config.LISTENER_CATCHUP and Config.ENABLE_EVENT_STORAGE:
+            submit_task(self._catch_up, alive_at)
+
+    def _catch_up(self, alive_at):
+        try:
+            events = self._missed_events(alive_at)
+        except Exception as e:
+            logger.error(f"Error loading missed events: {e}", exc_info=True)
+            connection.close()
+            return
+        self._handle_events(events)
+
+    def _missed_events(self, alive_at) -> list[Event]:
+        """
+        Stored events created since the connection was last alive, which this listener
+        hasn't dispatched yet. One range query on the created_at index, bounded by
+        LISTENER_CATCHUP_WINDOW and LISTENER_CATCHUP_LIMIT.
+        """
+        since = max(alive_at - CATCHUP_MARGIN, time.time() - Config.LISTENER_CATCHUP_WINDOW)
+        rows = (
+            get_event_model().objects
+            .filter(created_at__gte=datetime_from_timestamp(since))
+            .order_by('created_at')
+            .only('id', 'type', 'scope', 'detail', 'user_id')
+        )[:Config.LISTENER_CATCHUP_LIMIT]
+
+        events = []
+        for row in rows:
+            if row.id in self._seen:
+                continue
+            self._replayed.add(row.id)
+            events.append(row.as_event())
 
+        if events:
+            logger.info(f"Listener {self.instance_id} caught up on {len(events)} missed events")
+        return events
+
+    def _dispatch(self, event):
+        self._seen.add(event.id)
+        try:
             # Execute on-receive hook with parsed data
             processed_event = execute_on_receive_hook(event)
             if processed_event is None:
                 return  # Hook aborted the event
 
-            internal_signal.send(sender=self.instance_id, event=processed_event)
+            # Events that can't be encoded still reach backend subscribers, just not SSE clients
+            encoded = self._encode_frame(processed_event)
+            internal_signal.send(
+                sender=self.instance_id, event=processed_event, sse_delivered=not encoded
+            )
         except Exception as e:
             logger.error(f"Error handling event: {e}", exc_info=True)
+
+    @staticmethod
+    def _encode_frame(event) -> bool:
+        """Encode the SSE frame once for all connections on this node, False if there's none"""
+        if event.scope == Scope.SYSTEM:
+            return False
+        try:
+            event.sse_frame()
+        except Exception as e:
+            logger.error(f"Error encoding SSE frame of {event.type} event: {e}", exc_info=True)
+            return False
+        return True
+
+
+class AsyncListener(Listener):
+    """
+    Listener running on the server's event loop.
+
+    Notifications are received with psycopg's async notifies() and delivered straight
+    onto the SSE connection queues, without any thread hop. Hooks and sync `subscribe`
+    callbacks still run in the thread pool.
+    """
+
+    _running = weakref.WeakKeyDictionary()  # event loop -> listener
+
+    def __init__(self):
+        super().__init__()
+        self._task = None
+        self._catch_up_task = None
+
+    @classmethod
+    def ensure_started(cls) -> 'AsyncListener':
+        """Start a listener on the running event loop, unless one is already running there"""
+        loop = asyncio.get_running_loop()
+        listener = cls._running.get(loop)
+        if listener is None:
+            listener = cls()
+            listener.start()
+        return listener
+
+    def start(self):
+        """Start listener as a task on the running event loop"""
+        loop = asyncio.get_running_loop()
+        self._task = loop.create_task(self._alisten())
+        self._running[loop] = self
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _alisten(self):
+        logger.info(f"Starting async listener: {self.instance_id}")
+
+        async for payload in self.backend.alisten('djangorealtime'):
+            received_at = metrics.start()
+            try:
+                events = self._decode(payload)
+            except Exception as e:
+                logger.error(f"Error decoding event payload: {e}", exc_info=True)
+                continue
+
+            metrics.EVENTS_RECEIVED.inc(len(events))
+            events = [event for event in events if not self._replayed.discard(event.id)]
+            if any(isinstance(event, spillover.Reference) for event in events):
+                events = await run_in_thread(self._load_references, events)
+            for event in events:
+                await self._adispatch(event)
+                metrics.LISTENER_DISPATCH_SECONDS.observe_since(received_at)
+
+    def _on_listen(self, alive_at):
+        if alive_at is not None and Config.LISTENER_CATCHUP and Config.ENABLE_EVENT_STORAGE:
+            self._catch_up_task = asyncio.get_running_loop().create_task(self._acatch_up(alive_at))
+
+    async def _acatch_up(self, alive_at):
+        try:
+            events = await run_in_thread(self._load_missed_events, alive_at)
+        except Exception as e:
+            logger.error(f"Error loading missed events: {e}", exc_info=True)
+            return
+        for event in events:
+            await self._adispatch(event)
+
+    def _load_references(self, events):
+        try:
+            return self._resolve(events)
         finally:
             connection.close()
 
+    def _load_missed_events(self, alive_at):
+        try:
+            return self._missed_events(alive_at)
+        finally:
+            connection.close()
+
+    async def _adispatch(self, event):
+        self._seen.add(event.id)
+        try:
+            processed_event = event
+            if Config.ON_RECEIVE_HOOK:
+                processed_event = await run_in_thread(execute_on_receive_hook, event)
+            if processed_event is None:
+                return  # Hook aborted the event
+
+            if self._encode_frame(processed_event):
+                sse_connections.deliver(processed_event)
 
+            submit_task(self._send_signal, processed_event)
+        except Exception as e:
+            logger.error(f"Error handling event: {e}", exc_info=True)
+
+    def _send_signal(self, event):
+        try:
+            internal_signal.send(sender=self.instance_id, event=event, sse_delivered=True)
+        except Exception as e:
+            logger.error(f"Error handling event: {e}", exc_info=True)
+        finally:
+            connection.close()
@@ -0,0 +1,44 @@
+import asyncio
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from djangorealtime.benchmark import LISTENER_MODES, run_benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark publish-to-SSE latency and throughput with in-process clients"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100, help="Concurrent SSE clients")
+        parser.add_argument('--rate', type=float, default=100, help="Events published per second")
+        parser.add_argument('--duration', type=float, default=5, help="Seconds of publishing")
+        parser.add_argument(
+            '--user-ratio', type=float, default=0.5,
+            help="Share of user-scoped events, the rest are global",
+        )
+        parser.add_argument('--users', type=int, default=None, help="Distinct users of the clients")
+        parser.add_argument('--no-storage', action='store_true', help="Disable event storage")
+        parser.add_argument('--hook', action='store_true', help="Install a BEFORE_SEND_HOOK")
+        parser.add_argument(
+            '--listener', choices=LISTENER_MODES, default=None,
+            help="Listener delivering to the clients (default: LISTENER_MODE setting)",
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the JSON results to this file")
+
+    def handle(self, *args, **options):
+        result = asyncio.run(run_benchmark(
+            clients=options['clients'],
+            rate=options['rate'],
+            duration=options['duration'],
+            user_ratio=options['user_ratio'],
+            users=options['users'],
+            storage=not options['no_storage'],
+            hook=options['hook'],
+            listener=options['listener'],
+            seed=options['seed'],
+        ))
+        if options['output']:
+            Path(options['output']).write_text(result.to_json())
+        self.stdout.write(result.to_json())
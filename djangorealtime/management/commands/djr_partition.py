@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from djangorealtime import partitions
+
+
+class Command(BaseCommand):
+    help = "Convert the event tables to range partitions, or create and drop partitions (cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert', action='store_true',
+            help="Convert the event and activity tables to partitioned tables (once)",
+        )
+        parser.add_argument(
+            '--interval', choices=partitions.INTERVALS, default=None,
+            help="Partition range (default: PARTITION_INTERVAL setting)",
+        )
+        parser.add_argument(
+            '--premake', type=int, default=None,
+            help="Future partitions to create (default: PARTITION_PREMAKE setting)",
+        )
+        parser.add_argument(
+            '--retention-days', type=int, default=None,
+            help="Drop partitions that ended this many days ago "
+                 "(default: PARTITION_RETENTION_DAYS setting, unset keeps everything)",
+        )
+        parser.add_argument(
+            '--detach-only', action='store_true',
+            help="Detach expired partitions and keep them as tables instead of dropping them",
+        )
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if options['convert']:
+            try:
+                converted = partitions.convert(interval=options['interval'], using=using)
+            except ValueError as e:
+                raise CommandError(str(e)) from e
+            for table in converted:
+                self.stdout.write(f"Converted {table}")
+            if not converted:
+                self.stdout.write("Tables are already partitioned")
+
+        unpartitioned = [
+            model._meta.db_table for model in partitions.partitioned_models()
+            if not partitions.is_partitioned(model, using)
+        ]
+        if unpartitioned:
+            raise CommandError(
+                f"Not partitioned: {', '.join(unpartitioned)}. Run with --convert first."
+            )
+
+        created, dropped = partitions.maintain(
+            using=using,
+            interval=options['interval'],
+            premake=options['premake'],
+            retention_days=options['retention_days'],
+            detach_only=options['detach_only'],
+        )
+        for name in created:
+            self.stdout.write(f"Created {name}")
+        for name in dropped:
+            self.stdout.write(f"{'Detached' if options['detach_only'] else 'Dropped'} {name}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(created)} partitions created, {len(dropped)} expired"
+        ))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from djangorealtime import retention
+
+
+class Command(BaseCommand):
+    help = "Delete events past their retention (RETENTION_* settings), optionally archiving them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help="Retention of events without a type or scope rule (default: RETENTION_DAYS)",
+        )
+        parser.add_argument(
+            '--archive-dir', default=None,
+            help="Write expired rows to a gzip JSONL file in this directory before deleting",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help="Events deleted per batch (default: PRUNE_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=None,
+            help="Seconds between batches (default: PRUNE_SLEEP)",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true', help="Only count the expired events",
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            expired = retention.count_expired(days=options['days'])
+            for label, count in expired.items():
+                self.stdout.write(f"{label}: {count} expired events")
+            if not expired:
+                self.stdout.write("No retention configured")
+            return
+
+        def progress(label, deleted):
+            self.stdout.write(f"{label}: deleted {deleted}")
+
+        result = retention.prune(
+            days=options['days'],
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            archive_dir=options['archive_dir'],
+            progress=progress,
+        )
+        if result.archive:
+            self.stdout.write(f"Archived to {result.archive}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {result.events} events and {result.activities} activities"
+        ))
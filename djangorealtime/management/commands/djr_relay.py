@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from djangorealtime.backends.relay import Relay
+from djangorealtime.backends.utils import get_backend_options
+from djangorealtime.config import Config
+
+
+class Command(BaseCommand):
+    help = "Hold the host's LISTEN connection and relay notifications to workers over a Unix socket"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket', default=None,
+            help="Unix socket path (default: the BACKEND socket option, or RELAY_SOCKET setting)",
+        )
+
+    def handle(self, *args, **options):
+        # Same channel and database as the workers' RelayBackend
+        backend_options = get_backend_options()
+        socket_path = options['socket'] or backend_options.get('socket', Config.RELAY_SOCKET)
+        relay = Relay(socket_path, **backend_options)
+        if not relay.acquire():
+            raise CommandError(f"A relay is already running on {relay.socket_path}")
+        self.stdout.write(f"Relaying on {relay.socket_path}")
+        relay.serve_forever()
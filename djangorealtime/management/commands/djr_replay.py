@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from djangorealtime.publisher import REPLAY_CHUNK_SIZE, replay_queryset
+from djangorealtime.utils import get_event_model
+
+
+class Command(BaseCommand):
+    help = "Replay stored events, e.g. after an incident"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', action='append', dest='types', help="Event type, repeatable")
+        parser.add_argument('--scope', help="Event scope: user, public or system")
+        parser.add_argument('--user-id', help="Only events of this user")
+        parser.add_argument('--status', help="Only events in this status, e.g. new")
+        parser.add_argument('--since', help="Created at or after, ISO 8601")
+        parser.add_argument('--until', help="Created before, ISO 8601")
+        parser.add_argument('--chunk-size', type=int, default=REPLAY_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = get_event_model().objects.all()
+        if options['types']:
+            queryset = queryset.filter(type__in=options['types'])
+        for field in ('scope', 'user_id', 'status'):
+            if options[field]:
+                queryset = queryset.filter(**{field: options[field]})
+        if options['since']:
+            queryset = queryset.filter(created_at__gte=self._datetime(options['since']))
+        if options['until']:
+            queryset = queryset.filter(created_at__lt=self._datetime(options['until']))
+
+        total = queryset.count()
+        self.stdout.write(f"Replaying {total} events")
+
+        def progress(replayed):
+            self.stdout.write(f"Replayed {replayed}/{total}")
+
+        replayed = replay_queryset(queryset, chunk_size=options['chunk_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Replayed {replayed} events"))
+
+    @staticmethod
+    def _datetime(value):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Invalid datetime: {value}")
+        return parsed
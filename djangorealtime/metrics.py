@@ -0,0 +1,206 @@
+"""
+In-process metrics for the publish, fan-out and delivery hot paths.
+
+Disabled unless METRICS_ENABLED is set. Call sites take `start()` first, which is None when
+disabled, so the only cost then is a setting lookup. Read them with `snapshot()`, or in
+Prometheus text format with `render()` / `views.metrics_view`.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from .config import Config
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+def start() -> float | None:
+    """Start time for a measurement, None when metrics are disabled"""
+    return time.perf_counter() if Config.METRICS_ENABLED else None
+
+
+def enabled() -> bool:
+    return Config.METRICS_ENABLED
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        if not Config.METRICS_ENABLED:
+            return
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        for key, value in self.snapshot().items():
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # Labels -> [count per bucket..., +Inf count, sum]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _labels_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            values[index] += 1
+            values[-1] += value
+
+    def observe_since(self, started: float | None, **labels):
+        """Observe the seconds elapsed since start(), no-op when it was disabled"""
+        if started is not None:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> dict:
+        """Labels -> {'count', 'sum', 'buckets': {upper bound: cumulative count}}"""
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+        result = {}
+        for key, counts in values.items():
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip((*self.buckets, float('inf')), counts[:-1], strict=True):
+                cumulative += count
+                buckets[bound] = cumulative
+            result[key] = {'count': cumulative, 'sum': counts[-1], 'buckets': buckets}
+        return result
+
+    def samples(self):
+        for key, value in self.snapshot().items():
+            for bound, count in value['buckets'].items():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(key, (('le', le),))} {count}"
+            yield f"{self.name}_sum{_format_labels(key)} {value['sum']}"
+            yield f"{self.name}_count{_format_labels(key)} {value['count']}"
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+PUBLISH_SECONDS = Histogram(
+    'djangorealtime_publish_seconds',
+    'Publish latency by phase: persist, notify, or persist_notify when done in one statement',
+)
+LISTENER_DISPATCH_SECONDS = Histogram(
+    'djangorealtime_listener_dispatch_seconds',
+    'Time from receiving a notification to dispatching its event on this node',
+)
+FANOUT_SECONDS = Histogram(
+    'djangorealtime_fanout_seconds',
+    'Time to offer one event to every recipient SSE queue',
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1),
+)
+HOOK_SECONDS = Histogram(
+    'djangorealtime_hook_seconds',
+    'Hook execution time by hook',
+)
+EVENTS_RECEIVED = Counter(
+    'djangorealtime_events_received_total',
+    'Events received by the listener',
+)
+EVENTS_SENT = Counter(
+    'djangorealtime_events_sent_total',
+    'Events written to SSE streams',
+)
+
+METRICS = (
+    PUBLISH_SECONDS,
+    LISTENER_DISPATCH_SECONDS,
+    FANOUT_SECONDS,
+    HOOK_SECONDS,
+    EVENTS_RECEIVED,
+    EVENTS_SENT,
+)
+
+
+def _gauges() -> list[tuple[str, str, str, float]]:
+    """(name, type, help, value) read from live state at collection time"""
+    from .activity import activity_writer
+    from .registry import sse_connections
+
+    depths = [queue.qsize() for queue in sse_connections]
+    return [
+        ('djangorealtime_connections', 'gauge', 'Open SSE connections', len(depths)),
+        ('djangorealtime_queued_events', 'gauge', 'Events waiting in SSE queues', sum(depths)),
+        (
+            'djangorealtime_queue_depth_max', 'gauge',
+            'Deepest SSE queue', max(depths, default=0),
+        ),
+        (
+            'djangorealtime_dropped_events_total', 'counter',
+            'Events dropped by full SSE queues', sse_connections.dropped,
+        ),
+        (
+            'djangorealtime_disconnected_total', 'counter',
+            'Slow SSE connections closed by the disconnect policy', sse_connections.disconnected,
+        ),
+        (
+            'djangorealtime_dropped_activities_total', 'counter',
+            'Activities dropped by the full activity buffer', activity_writer.dropped,
+        ),
+    ]
+
+
+def snapshot() -> dict:
+    """All metrics by name. Histograms and counters are keyed by label tuples."""
+    result = {metric.name: metric.snapshot() for metric in METRICS}
+    result.update({name: value for name, _, _, value in _gauges()})
+    return result
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(metric.samples())
+    for name, metric_type, help, value in _gauges():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for metric in METRICS:
+        metric.reset()
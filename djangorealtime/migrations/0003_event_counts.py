@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangorealtime', '0002_eventactivity'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='eventactivity',
+            options={'verbose_name_plural': 'Event activities'},
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='delivered_count',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='dispatched_count',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='error_count',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='read_count',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='sent_count',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.postgres.indexes import GinIndex, Index
 from django.db import models
+from django.db.models import Case, F, PositiveIntegerField, Q, Value, When
 
 
 class Event(models.Model):
@@ -12,6 +13,12 @@ class Event(models.Model):
     data_store = models.JSONField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Per-status delivery counts, kept instead of activity rows in the 'counters' ACTIVITY_MODE
+    dispatched_count = models.PositiveIntegerField(default=0, db_default=0)
+    sent_count = models.PositiveIntegerField(default=0, db_default=0)
+    delivered_count = models.PositiveIntegerField(default=0, db_default=0)
+    read_count = models.PositiveIntegerField(default=0, db_default=0)
+    error_count = models.PositiveIntegerField(default=0, db_default=0)
 
     class Meta:
         indexes = [
@@ -57,6 +64,102 @@ class Event(models.Model):
                 self.status = status_label
                 self.save(update_fields=['status'])
 
+    @classmethod
+    def add_activities(cls, activities):
+        """
+        Bulk version of add_activity for (event_id, status_label, user_id) tuples.
+        Writes all activity rows with one INSERT and progresses statuses with one UPDATE.
+        Activities for events that no longer exist are skipped.
+        """
+        from django.db import transaction
+
+        from djangorealtime.structs import Status
+
+        if not activities:
+            return
+
+        # Events may have been deleted (or rolled back) since the activity was recorded
+        existing = set(cls.objects.filter(
+            id__in={event_id for event_id, _, _ in activities}
+        ).values_list('id', flat=True))
+        activities = [activity for activity in activities if activity[0] in existing]
+
+        targets = {}
+        for event_id, status_label, _ in activities:
+            status = Status(status_label)
+            current = targets.get(event_id)
+            if current is None or status.is_progression_from(current):
+                targets[event_id] = status
+
+        with transaction.atomic():
+            EventActivity.objects.bulk_create([
+                EventActivity(event_id=event_id, status=status_label, user_id=user_id)
+                for event_id, status_label, user_id in activities
+            ])
+            cls._progress_statuses(targets)
+
+    @classmethod
+    def add_counts(cls, counts):
+        """
+        Counter version of add_activities for {(event_id, status_label): count}.
+        Increments the per-status count fields with one UPDATE and progresses statuses.
+        """
+        from django.db import transaction
+
+        from djangorealtime.structs import Status
+
+        if not counts:
+            return
+
+        targets = {}
+        increments = {}
+        for (event_id, status_label), count in counts.items():
+            status = Status(status_label)
+            current = targets.get(event_id)
+            if current is None or status.is_progression_from(current):
+                targets[event_id] = status
+            increments.setdefault(f'{status.value}_count', []).append(
+                When(id=event_id, then=Value(count))
+            )
+
+        updates = {
+            name: F(name) + Case(*whens, default=Value(0), output_field=PositiveIntegerField())
+            for name, whens in increments.items()
+        }
+        with transaction.atomic():
+            cls.objects.filter(id__in=targets).update(**updates)
+            cls._progress_statuses(targets)
+
+    @classmethod
+    def _progress_statuses(cls, targets):
+        """Move events to their target status with one UPDATE, only if it's a progression"""
+        from djangorealtime.structs import Status
+
+        by_status = {}
+        for event_id, status in targets.items():
+            by_status.setdefault(status, []).append(event_id)
+
+        condition = Q()
+        whens = []
+        for status, event_ids in by_status.items():
+            previous = [s.value for s in Status if status.is_progression_from(s)]
+            match = Q(id__in=event_ids, status__in=previous)
+            condition |= match
+            whens.append(When(match, then=Value(status.value)))
+
+        if whens:
+            cls.objects.filter(condition).update(status=Case(*whens, default=F('status')))
+
+    @property
+    def counts(self) -> dict:
+        """Delivery counts by status label, from the 'counters' ACTIVITY_MODE"""
+        from djangorealtime.structs import Status
+
+        return {
+            status.value: getattr(self, f'{status.value}_count')
+            for status in Status if status != Status.NEW
+        }
+
     def data_store_update(self, key, value):
         """Merge a value into a key in data_store (shallow merge)."""
         current_data = self.data_store.get(key, {})
@@ -64,6 +167,19 @@ class Event(models.Model):
         self.data_store[key] = new_data
         self.save()
 
+    def as_event(self):
+        """Event struct for this stored event, with the same ID."""
+        from djangorealtime.structs import Event as EventStruct
+        from djangorealtime.structs import Scope
+
+        return EventStruct(
+            id=self.id,
+            type=self.type,
+            scope=Scope(self.scope),
+            detail=self.detail,
+            user_id=self.user_id,
+        )
+
     def replay(self):
         """
         Replay this event by republishing it with the same ID.
@@ -72,24 +188,15 @@ class Event(models.Model):
         Returns:
             The Event struct that was published
         """
-        from djangorealtime.backends.utils import get_backend
-        from djangorealtime.structs import Event as EventStruct
-        from djangorealtime.structs import Scope
+        from djangorealtime.publisher import _get_backend
 
         # Create Event struct with same ID and data
-        event = EventStruct(
-            id=self.id,
-            type=self.type,
-            scope=Scope(self.scope),
-            detail=self.detail,
-            user_id=self.user_id,
-        )
+        event = self.as_event()
 
         self.status = 'new'
         self.save()
 
-        backend = get_backend()
-        backend.publish(event)
+        _get_backend().publish(event)
 
         return event
 
@@ -0,0 +1,339 @@
+"""
+Range partitioning of the event and activity tables on `created_at`.
+
+Opt-in: `convert()` turns the existing tables into partitioned tables, keeping their rows in
+a `<table>_legacy` partition, and `maintain()` pre-creates future partitions and drops expired
+ones. Both are run by the `djr_partition` command. Dropping a partition is O(1) and keeps the
+indexes of the hot partitions small, unlike DELETE-based cleanup.
+
+PostgreSQL requires the primary key of a partitioned table to include the partition key, so
+it becomes `(id, created_at)`, and the activity foreign key to the event table is dropped
+(Django still cascades deletes). Rows outside every range land in a `<table>_default`
+partition; they are moved out when their partition is created.
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .config import Config
+from .models import EventActivity
+from .utils import get_event_model, logger
+
+INTERVALS = ('day', 'week', 'month')
+
+_BOUND_RE = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \((?:'([^']+)'|MAXVALUE)\)")
+
+
+@dataclass
+class Partition:
+    name: str
+    lower: datetime | None  # None for MINVALUE and the default partition
+    upper: datetime | None  # None for MAXVALUE and the default partition
+    default: bool = False
+
+
+def partitioned_models() -> list:
+    """Models whose tables are partitioned, in the order they're maintained"""
+    return [get_event_model(), EventActivity]
+
+
+def period_start(value: datetime, interval: str) -> datetime:
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == 'day':
+        return value
+    if interval == 'week':
+        return value - timedelta(days=value.weekday())
+    if interval == 'month':
+        return value.replace(day=1)
+    raise ValueError(f"PARTITION_INTERVAL must be one of {INTERVALS}, got {interval!r}")
+
+
+def next_period(start: datetime, interval: str) -> datetime:
+    if interval == 'day':
+        return start + timedelta(days=1)
+    if interval == 'week':
+        return start + timedelta(weeks=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def _literal(value: datetime) -> str:
+    return f"'{value.isoformat(sep=' ')}'"
+
+
+def _parse_bound(value: str | None) -> datetime | None:
+    # Aware in the connection's time zone with USE_TZ, naive otherwise, like the column
+    # parse_datetime, as fromisoformat() can't parse the '+00' offset before Python 3.11
+    return parse_datetime(value) if value is not None else None
+
+
+def is_partitioned(model, using: str = 'default') -> bool:
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+            [model._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+def partitions(model, using: str = 'default') -> list[Partition]:
+    """Partitions of the model's table, ordered by range, default partition last"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)",
+            [model._meta.db_table],
+        )
+        rows = cursor.fetchall()
+
+    result = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound)
+        if match is None:
+            result.append(Partition(name, None, None, default=True))
+        else:
+            result.append(Partition(name, _parse_bound(match[1]), _parse_bound(match[2])))
+    ranged = [p for p in result if not p.default]
+    ranged.sort(key=lambda p: (p.lower is not None, p.lower))
+    return ranged + [p for p in result if p.default]
+
+
+def _partition_name(table: str, lower: datetime) -> str:
+    return f'{table}_p{lower:%Y%m%d}'
+
+
+def _create_partition(cursor, table: str, lower: datetime, upper: datetime) -> str:
+    """Create the partition for [lower, upper), moving its rows out of the default partition"""
+    name = _partition_name(table, lower)
+    bounds = f"FROM ({_literal(lower)}) TO ({_literal(upper)})"
+    default = f'{table}_default'
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE created_at >= %s AND created_at < %s)',
+        [lower, upper],
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES {bounds}')
+        return name
+
+    # Attaching validates that the default partition holds no rows of the new range
+    cursor.execute(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{default}" WHERE created_at >= %s AND created_at < %s '
+        f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved',
+        [lower, upper],
+    )
+    cursor.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" FOR VALUES {bounds}')
+    return name
+
+
+def create_partitions(
+        premake: int | None = None,
+        interval: str | None = None,
+        using: str = 'default',
+) -> list[str]:
+    """
+    Create the partitions of the current period and the `premake` next ones, where missing.
+    Periods missed since the last partition are created too, so their rows leave the default
+    partition and expire with them.
+
+    Returns:
+        Names of the created partitions
+    """
+    premake = Config.PARTITION_PREMAKE if premake is None else premake
+    interval = interval or Config.PARTITION_INTERVAL
+    end = period_start(timezone.now(), interval)
+    for _ in range(premake + 1):
+        end = next_period(end, interval)
+
+    created = []
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for model in partitioned_models():
+            table = model._meta.db_table
+            lower = max(
+                (p.upper for p in partitions(model, using) if p.upper is not None),
+                default=period_start(timezone.now(), interval),
+            )
+            while lower < end:
+                upper = next_period(period_start(lower, interval), interval)
+                created.append(_create_partition(cursor, table, lower, upper))
+                lower = upper
+    for name in created:
+        logger.info(f"Created partition {name}")
+    return created
+
+
+def drop_expired_partitions(
+        retention_days: int | None = None,
+        detach_only: bool = False,
+        using: str = 'default',
+) -> list[str]:
+    """
+    Drop partitions whose range ended more than `retention_days` ago, activities first.
+    With `detach_only`, they're detached and kept as standalone tables, e.g. for archiving.
+
+    Returns:
+        Names of the dropped (or detached) partitions
+    """
+    retention_days = Config.PARTITION_RETENTION_DAYS if retention_days is None else retention_days
+    if retention_days is None:
+        return []
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    dropped = []
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for model in reversed(partitioned_models()):
+            table = model._meta.db_table
+            for partition in partitions(model, using):
+                if partition.upper is None or partition.upper > cutoff:
+                    continue
+                cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{partition.name}"')
+                if not detach_only:
+                    cursor.execute(f'DROP TABLE "{partition.name}"')
+                dropped.append(partition.name)
+    for name in dropped:
+        logger.info(f"{'Detached' if detach_only else 'Dropped'} partition {name}")
+    return dropped
+
+
+def maintain(using: str = 'default', **options) -> tuple[list[str], list[str]]:
+    """Create upcoming partitions and drop expired ones. Returns (created, dropped) names."""
+    created = create_partitions(
+        premake=options.get('premake'), interval=options.get('interval'), using=using,
+    )
+    dropped = drop_expired_partitions(
+        retention_days=options.get('retention_days'),
+        detach_only=options.get('detach_only', False),
+        using=using,
+    )
+    return created, dropped
+
+
+def _convert_table(schema_editor, model, interval: str):
+    """Turn the model's table into a partitioned table, its rows kept in a legacy partition"""
+    cursor = schema_editor.connection.cursor()
+    table = model._meta.db_table
+    legacy = f'{table}_legacy'
+
+    # Drop the primary key and free the index names for the partitioned table
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+        [table],
+    )
+    for (name,) in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{name}"')
+    cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+    for index in model._meta.indexes:
+        cursor.execute(f'ALTER INDEX IF EXISTS "{index.name}" RENAME TO "{index.name}_legacy"')
+
+    pk = model._meta.pk
+    auto_pk = pk.get_internal_type() in ('AutoField', 'BigAutoField', 'SmallAutoField')
+    if auto_pk:
+        # Identity columns aren't supported on partitioned tables before PostgreSQL 17
+        cursor.execute(
+            "SELECT attidentity FROM pg_attribute "
+            "WHERE attrelid = to_regclass(%s) AND attname = %s",
+            [legacy, pk.column],
+        )
+        if cursor.fetchone()[0]:
+            cursor.execute(f'ALTER TABLE "{legacy}" ALTER COLUMN "{pk.column}" DROP IDENTITY')
+        else:
+            cursor.execute(f'ALTER TABLE "{legacy}" ALTER COLUMN "{pk.column}" DROP DEFAULT')
+
+    # Keeps the column defaults, other than the primary key's dropped above
+    cursor.execute(
+        f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) '
+        f'PARTITION BY RANGE (created_at)'
+    )
+    cursor.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY ("{pk.column}", created_at)')
+    if auto_pk:
+        sequence = f'{table}_{pk.column}_seq'
+        cursor.execute(f'DROP SEQUENCE IF EXISTS "{sequence}"')
+        cursor.execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{table}"."{pk.column}"')
+        cursor.execute(
+            f'ALTER TABLE "{table}" ALTER COLUMN "{pk.column}" SET DEFAULT nextval(%s)',
+            [sequence],
+        )
+        cursor.execute(
+            f'SELECT setval(%s, COALESCE(MAX("{pk.column}"), 0) + 1, false) FROM "{legacy}"',
+            [sequence],
+        )
+
+    # The legacy partition covers everything up to the first period without rows
+    cursor.execute(f'SELECT MAX(created_at) FROM "{legacy}"')
+    latest = cursor.fetchone()[0]
+    upper = period_start(timezone.now(), interval)
+    if latest is not None and latest >= upper:
+        upper = next_period(period_start(latest, interval), interval)
+    cursor.execute(
+        f'ALTER TABLE "{table}" ATTACH PARTITION "{legacy}" '
+        f'FOR VALUES FROM (MINVALUE) TO ({_literal(upper)})'
+    )
+    # Matching indexes of the legacy partition are attached instead of built again
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+    cursor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+
+def _foreign_keys(cursor, models) -> tuple[list[tuple[str, str]], list[str]]:
+    """
+    Foreign keys referencing the models' tables: the activity's own event constraints as
+    (table, name), and descriptions of any other table's, which convert() won't drop.
+    """
+    own, foreign = [], []
+    for model in models:
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname, conrelid = to_regclass(%s) "
+            "FROM pg_constraint WHERE confrelid = to_regclass(%s) AND contype = 'f'",
+            [EventActivity._meta.db_table, model._meta.db_table],
+        )
+        for referencing, name, is_activity in cursor.fetchall():
+            if is_activity and model is not EventActivity:
+                own.append((referencing, name))
+            else:
+                foreign.append(f"{referencing}.{name} -> {model._meta.db_table}")
+    return own, foreign
+
+
+def convert(interval: str | None = None, using: str = 'default') -> list[str]:
+    """
+    Convert the event and activity tables to partitioned tables, skipping converted ones,
+    then create the upcoming partitions.
+
+    Takes an exclusive lock on both tables and scans their rows once, to validate the legacy
+    partition and build its `(id, created_at)` primary key: run it in a maintenance window.
+    Raises ValueError if other tables have foreign keys to them.
+
+    Returns:
+        Names of the converted tables
+    """
+    interval = interval or Config.PARTITION_INTERVAL
+    period_start(timezone.now(), interval)  # Validate the interval
+    models = partitioned_models()
+    converted = []
+    connection = connections[using]
+    with transaction.atomic(using=using), connection.schema_editor(atomic=False) as editor:
+        cursor = connection.cursor()
+        # Check deferred foreign keys now, tables with pending checks can't be altered
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        # Foreign keys must reference a unique constraint that includes the partition key
+        own, foreign = _foreign_keys(cursor, models)
+        if foreign:
+            raise ValueError(
+                f"Can't partition tables referenced by foreign keys: {', '.join(foreign)}. "
+                f"Drop these constraints first."
+            )
+        for referencing, name in own:
+            cursor.execute(f'ALTER TABLE {referencing} DROP CONSTRAINT "{name}"')
+
+        for model in models:
+            if not is_partitioned(model, using):
+                _convert_table(editor, model, interval)
+                converted.append(model._meta.db_table)
+        create_partitions(interval=interval, using=using)
+    for table in converted:
+        logger.info(f"Converted {table} to a partitioned table")
+    return converted
@@ -1,10 +1,16 @@
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 
+from django.db.models import QuerySet
+from django.db.models.functions import Now
 from django.dispatch import receiver
 
 from .backends.utils import get_backend
+from .debounce import Debouncer
 from .signals import internal_signal
 from .structs import Event, Scope, Status
+from .utils import logger
+
+REPLAY_CHUNK_SIZE = 2000
 
 _backend = None
 
@@ -17,6 +23,30 @@ def _get_backend():
     return _backend
 
 
+def _persist_and_publish(event: Event, private_data: dict | None = None):
+    _get_backend().persist_and_publish(event, private_data=private_data)
+
+
+debouncer = Debouncer(_persist_and_publish)
+
+
+def _publish(event: Event, private_data: dict | None):
+    """Publish now, or at the end of the debounce window if the event type has one"""
+    window = debouncer.window(event)
+    if window:
+        debouncer.submit(event, private_data, window)
+    else:
+        _persist_and_publish(event, private_data)
+
+
+async def _apublish(event: Event, private_data: dict | None):
+    window = debouncer.window(event)
+    if window:
+        debouncer.submit(event, private_data, window)
+    else:
+        await _get_backend().apersist_and_publish(event, private_data=private_data)
+
+
 def publish(
         user_id: str | int,
         event_type: str,
@@ -36,8 +66,7 @@ def publish(
         The published event dict
     """
     event = Event(type=event_type, detail=detail or {}, scope=Scope.USER, user_id=str(user_id))
-    event.persist(private_data=private_data)
-    _get_backend().publish(event)
+    _publish(event, private_data)
 
     return event
 
@@ -60,8 +89,7 @@ def publish_global(event_type: str, detail: dict | None = None, private_data: di
         publish_global('simple_event')
     """
     event = Event(type=event_type, detail=detail or {}, scope=Scope.PUBLIC)
-    event.persist(private_data=private_data)
-    _get_backend().publish(event)
+    _publish(event, private_data)
 
     return event
 
@@ -90,12 +118,170 @@ def publish_system(
         scope=Scope.SYSTEM,
         user_id=str(user_id) if user_id else None
     )
-    event.persist(private_data=private_data)
-    _get_backend().publish(event)
+    _publish(event, private_data)
 
     return event
 
 
+def publish_many(events: Iterable[Event], private_data: dict | None = None) -> list[Event]:
+    """
+    Publish many events at once.
+    Events are stored with one bulk insert and sent with as few NOTIFY payloads as possible.
+
+    Args:
+        events: Event structs to publish, of any scope
+        private_data: private data to store in DB with every event, not sent to frontend (optional)
+
+    Returns:
+        The published events
+    """
+    events = list(events)
+    if events:
+        _get_backend().persist_and_publish_many(events, private_data=private_data)
+
+    return events
+
+
+def publish_many_users(
+        user_ids: Iterable[str | int],
+        event_type: str,
+        detail: dict | None = None,
+        private_data: dict | None = None
+) -> list[Event]:
+    """
+    Publish the same event to many users.
+
+    Example:
+        publish_many_users(team.member_ids, 'export_finished', {'export_id': export.id})
+
+    Returns:
+        The published events, one per user
+    """
+    events = [
+        Event(type=event_type, detail=dict(detail or {}), scope=Scope.USER, user_id=str(user_id))
+        for user_id in user_ids
+    ]
+    return publish_many(events, private_data=private_data)
+
+
+def publish_many_global(
+        event_type: str,
+        details: Iterable[dict],
+        private_data: dict | None = None
+) -> list[Event]:
+    """
+    Publish many global events of the same type, one per detail dict.
+
+    Example:
+        publish_many_global('row_updated', [{':id': row.id} for row in rows])
+
+    Returns:
+        The published events
+    """
+    events = [Event(type=event_type, detail=detail or {}, scope=Scope.PUBLIC) for detail in details]
+    return publish_many(events, private_data=private_data)
+
+
+async def apublish(
+        user_id: str | int,
+        event_type: str,
+        detail: dict | None = None,
+        private_data: dict | None = None
+):
+    """Async version of publish, for async views and tasks. Never blocks the event loop."""
+    event = Event(type=event_type, detail=detail or {}, scope=Scope.USER, user_id=str(user_id))
+    await _apublish(event, private_data)
+
+    return event
+
+
+async def apublish_global(
+        event_type: str,
+        detail: dict | None = None,
+        private_data: dict | None = None
+):
+    """Async version of publish_global."""
+    event = Event(type=event_type, detail=detail or {}, scope=Scope.PUBLIC)
+    await _apublish(event, private_data)
+
+    return event
+
+
+async def apublish_system(
+        event_type: str,
+        detail: dict | None = None,
+        user_id: str | int | None = None,
+        private_data: dict | None = None
+):
+    """Async version of publish_system."""
+    event = Event(
+        type=event_type,
+        detail=detail or {},
+        scope=Scope.SYSTEM,
+        user_id=str(user_id) if user_id else None
+    )
+    await _apublish(event, private_data)
+
+    return event
+
+
+def replay_queryset(
+        queryset: QuerySet,
+        chunk_size: int = REPLAY_CHUNK_SIZE,
+        progress: Callable[[int], None] | None = None
+) -> int:
+    """
+    Republish stored events with their original ids, oldest first.
+
+    Rows are streamed with a server-side cursor. Per chunk, statuses are reset with one
+    UPDATE and the events are sent with as few NOTIFY payloads as possible.
+
+    Args:
+        queryset: Events to replay, of the event model
+        chunk_size: Events per UPDATE and NOTIFY batch
+        progress: Called with the number of events replayed so far, after each chunk
+
+    Returns:
+        The number of events replayed
+
+    Example:
+        replay_queryset(Event.objects.filter(type='invoice_paid', created_at__gte=incident_start))
+    """
+    rows = (
+        queryset.order_by('created_at')
+        .values_list('id', 'type', 'scope', 'detail', 'user_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    replayed = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            replayed += _replay_chunk(queryset.model, chunk)
+            chunk = []
+            if progress:
+                progress(replayed)
+    if chunk:
+        replayed += _replay_chunk(queryset.model, chunk)
+        if progress:
+            progress(replayed)
+
+    logger.info(f"Replayed {replayed} events")
+    return replayed
+
+
+def _replay_chunk(model, rows: list[tuple]) -> int:
+    events = [
+        Event(id=event_id, type=event_type, scope=scope, detail=detail, user_id=user_id)
+        for event_id, event_type, scope, detail, user_id in rows
+    ]
+    model.objects.filter(id__in=[event.id for event in events]).update(
+        status=Status.NEW.value, updated_at=Now()
+    )
+    _get_backend().publish_many(events)
+    return len(events)
+
+
 def subscribe(callback: Callable[[Event], None]) -> Callable:
     """
     Subscribe to all events from the backend.
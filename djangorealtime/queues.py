@@ -1,17 +1,99 @@
 import asyncio
+import contextlib
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
 
+from .config import Config
 from .structs import Event, Scope
+from .utils import logger
 
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+COALESCE = 'coalesce'
+DISCONNECT = 'disconnect'
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, COALESCE, DISCONNECT)
 
-class RequestQueue(asyncio.Queue):
-    """Async queue for SSE request session"""
+# Queued by the heartbeat ticker to wake an idle stream
+HEARTBEAT = object()
 
-    def __init__(self, user_id: str, maxsize=100):
-        super().__init__(maxsize)
+# Ends a subscription pattern matching every type with that prefix, e.g. order_*
+WILDCARD = '*'
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """Event types a connection receives: exact types, and prefixes from `order_*` patterns"""
+    types: frozenset[str] = frozenset()
+    prefixes: tuple[str, ...] = ()
+
+    @classmethod
+    def parse(cls, value: str | None) -> 'Subscription | None':
+        """From a comma separated list like `?types=`. None, every type, if empty or `*`."""
+        names = {name.strip() for name in (value or '').split(',')} - {''}
+        if not names or WILDCARD in names:
+            return None
+        return cls(
+            types=frozenset(name for name in names if not name.endswith(WILDCARD)),
+            prefixes=tuple(sorted(name[:-1] for name in names if name.endswith(WILDCARD))),
+        )
+
+    def matches(self, event_type: str) -> bool:
+        return event_type in self.types or event_type.startswith(self.prefixes)
+
+
+def coalesce_key(event: Event) -> tuple[str, object] | None:
+    """Events with the same type and :id supersede each other, events without :id never do"""
+    if not isinstance(event.detail, dict) or event.detail.get(':id') is None:
+        return None
+    return event.type, event.detail[':id']
+
+
+class ConnectionQueue:
+    """
+    Delivery policy shared by the async and sync SSE connection queues.
+
+    When full, `offer()` applies the overflow policy (SSE_OVERFLOW_POLICY by default):
+    - drop_newest: discard the incoming event
+    - drop_oldest: discard the oldest queued event to make room
+    - coalesce: replace a queued event with the same type and :id, else drop the oldest
+    - disconnect: mark the queue overflowed, the stream ends and the client resumes
+      from its Last-Event-ID
+    Every discarded event is counted in `dropped`.
+
+    A connection with a `subscription` only receives the event types it subscribed to,
+    the registry filters them before offering.
+
+    Event types listed in CONFLATE_EVENT_TYPES are conflated: while an event waits in the
+    queue, a newer one with the same type and :id replaces it, counted in `conflated`.
+    """
+
+    def _init_policy(
+            self, user_id: str, policy: str | None, subscription: Subscription | None = None
+    ):
+        policy = policy or Config.SSE_OVERFLOW_POLICY
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown SSE overflow policy: {policy}")
         self.user_id = user_id
+        self.policy = policy
+        self.subscription = subscription
+        self.dropped = 0
+        self.conflated = 0
+        self.overflowed = False
+        # Monotonic time of the last message sent on the stream, see HeartbeatTicker
+        self.last_sent = 0.0
+        self._heartbeat_queued = False
+        # Latest event per conflation key, for the events waiting in the queue
+        self._pending: dict[tuple[str, object], Event] = {}
+
+    def subscribed_to(self, event_type: str) -> bool:
+        return self.subscription is None or self.subscription.matches(event_type)
 
     def should_receive(self, event: Event):
-        """Only receive events for this user or broadcasts"""
+        """Only receive subscribed events for this user or broadcasts"""
+        if not self.subscribed_to(event.type):
+            return False
         if event.scope == Scope.PUBLIC:
             return True
         if event.scope == Scope.SYSTEM:
@@ -19,3 +101,179 @@ class RequestQueue(asyncio.Queue):
         if event.scope == Scope.USER and event.user_id is None:
             return False
         return str(event.user_id) == str(self.user_id)
+
+    def offer(self, event: Event) -> int:
+        """Put the event without blocking. Returns the number of events dropped to do so."""
+        if self.overflowed:
+            return self._drop(1)
+        key = self._conflation_key(event)
+        if key is not None and key in self._pending:
+            self._pending[key] = event
+            self.conflated += 1
+            return 0
+        if not self.full():
+            self.put_nowait(event)
+            return 0
+
+        if self.policy == DROP_NEWEST:
+            return self._drop(1)
+        if self.policy == DISCONNECT:
+            # The consumer stops at its next get, nothing queued is sent anymore
+            self.overflowed = True
+            return self._drop(1 + self.qsize())
+        if self.policy == COALESCE and self._replace(event):
+            return self._drop(1)
+
+        oldest = self.get_nowait()
+        self.put_nowait(event)
+        return 0 if oldest is HEARTBEAT else self._drop(1)
+
+    def handover_loop(self) -> asyncio.AbstractEventLoop | None:
+        """Event loop that offers from the current thread must be handed over to, if any"""
+        return None
+
+    def heartbeat(self):
+        """Queue a heartbeat, unless one is already waiting or the queue is full"""
+        if not self._heartbeat_queued and not self.full():
+            self._heartbeat_queued = True
+            self.put_nowait(HEARTBEAT)
+
+    def _put(self, item):
+        key = self._conflation_key(item)
+        if key is not None:
+            self._pending[key] = item
+        super()._put(item)
+
+    def _get(self):
+        item = super()._get()
+        if item is HEARTBEAT:
+            self._heartbeat_queued = False
+            return item
+        key = self._conflation_key(item)
+        if key is not None:
+            return self._pending.pop(key, item)
+        return item
+
+    @staticmethod
+    def _conflation_key(event: Event) -> tuple[str, object] | None:
+        if event is HEARTBEAT or event.type not in Config.CONFLATE_EVENT_TYPES:
+            return None
+        return coalesce_key(event)
+
+    def _replace(self, event: Event) -> bool:
+        key = coalesce_key(event)
+        if key is None:
+            return False
+        for index, queued in enumerate(self._queue):
+            if queued is not HEARTBEAT and coalesce_key(queued) == key:
+                del self._queue[index]
+                self._queue.append(event)
+                return True
+        return False
+
+    def _drop(self, count: int) -> int:
+        if self.dropped == 0:
+            logger.warning(f"SSE queue full for user {self.user_id}, applying {self.policy} policy")
+        self.dropped += count
+        return count
+
+
+class RequestQueue(ConnectionQueue, asyncio.Queue):
+    """
+    Async queue for SSE request session.
+
+    Offers from other threads, like the threaded listener's, are handed over to the
+    queue's event loop, so a waiting stream is woken right away. The registry hands
+    over all of a loop's queues in one callback, see ConnectionRegistry.deliver().
+    """
+
+    def __init__(
+            self,
+            user_id: str,
+            maxsize: int | None = None,
+            policy: str | None = None,
+            subscription: Subscription | None = None,
+    ):
+        asyncio.Queue.__init__(self, Config.SSE_QUEUE_SIZE if maxsize is None else maxsize)
+        self._init_policy(user_id, policy, subscription)
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None  # Only offered to from the current thread
+        self._loop_thread = threading.get_ident()
+
+    def handover_loop(self) -> asyncio.AbstractEventLoop | None:
+        if self._loop is not None and threading.get_ident() != self._loop_thread:
+            return self._loop
+        return None
+
+    def offer(self, event: Event) -> int:
+        loop = self.handover_loop()
+        if loop is not None:
+            with contextlib.suppress(RuntimeError):  # Loop closed, the stream is gone
+                loop.call_soon_threadsafe(super().offer, event)
+            return 0
+        return super().offer(event)
+
+
+class _DequeStorage:
+    """Bottom of SyncRequestQueue's _put/_get chain, like asyncio.Queue's"""
+
+    def _put(self, item):
+        self._queue.append(item)
+
+    def _get(self):
+        return self._queue.popleft()
+
+
+class SyncRequestQueue(ConnectionQueue, _DequeStorage):
+    """Thread-safe queue for SSE request session on WSGI, the stream blocks in get()"""
+
+    def __init__(
+            self,
+            user_id: str,
+            maxsize: int | None = None,
+            policy: str | None = None,
+            subscription: Subscription | None = None,
+    ):
+        self.maxsize = Config.SSE_QUEUE_SIZE if maxsize is None else maxsize
+        self._queue = deque()
+        self._not_empty = threading.Condition(threading.RLock())
+        self._init_policy(user_id, policy, subscription)
+
+    def offer(self, event: Event) -> int:
+        with self._not_empty:
+            return super().offer(event)
+
+    def heartbeat(self):
+        with self._not_empty:
+            super().heartbeat()
+
+    def get(self, timeout: float | None = None):
+        """Next item, waiting for one. Raises queue.Empty after timeout."""
+        with self._not_empty:
+            if not self._not_empty.wait_for(self._queue.__len__, timeout):
+                raise queue.Empty
+            return self._get()
+
+    def get_nowait(self):
+        with self._not_empty:
+            if not self._queue:
+                raise queue.Empty
+            return self._get()
+
+    def put_nowait(self, item):
+        with self._not_empty:
+            if self.full():
+                raise queue.Full
+            self._put(item)
+            self._not_empty.notify()
+
+    def qsize(self) -> int:
+        return len(self._queue)
+
+    def empty(self) -> bool:
+        return not self._queue
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= len(self._queue)
@@ -0,0 +1,162 @@
+import contextlib
+import threading
+
+from . import metrics
+from .queues import ConnectionQueue
+from .structs import Event, Scope
+
+
+class ConnectionRegistry:
+    """
+    Index of open SSE connection queues.
+
+    User streams are keyed by user id, so a user-scoped event only touches that
+    user's queues. Anonymous streams aren't indexed by user, so they only ever
+    receive public events.
+
+    Public events go to the queues without a subscription, plus the subscribed ones
+    indexed by type and by prefix, so they never touch the queues that didn't subscribe.
+
+    `dropped` counts events dropped by full queues across all connections and
+    `disconnected` the slow connections closed by the disconnect overflow policy.
+
+    Async and WSGI streams add and discard their queues from different threads,
+    so changes are locked. Lookups work on snapshots and don't lock.
+    """
+
+    def __init__(self):
+        self.users: dict[str, set[ConnectionQueue]] = {}
+        self.broadcast: set[ConnectionQueue] = set()
+        self.unfiltered: set[ConnectionQueue] = set()
+        self.by_type: dict[str, set[ConnectionQueue]] = {}
+        self.by_prefix: dict[str, set[ConnectionQueue]] = {}
+        self.disconnected = 0
+        self._closed_dropped = 0  # Dropped by queues no longer registered
+        self._lock = threading.Lock()
+
+    @property
+    def dropped(self) -> int:
+        return self._closed_dropped + sum(queue.dropped for queue in tuple(self.broadcast))
+
+    def add(self, queue: ConnectionQueue):
+        with self._lock:
+            self.broadcast.add(queue)
+            self._index(queue)
+            if queue.user_id is not None:
+                self.users.setdefault(queue.user_id, set()).add(queue)
+
+    def discard(self, queue: ConnectionQueue):
+        with self._lock:
+            if queue not in self.broadcast:
+                return
+            self.broadcast.discard(queue)
+            self._unindex(queue)
+            self._closed_dropped += queue.dropped
+            if queue.overflowed:
+                self.disconnected += 1
+            if queue.user_id is None:
+                return
+            queues = self.users.get(queue.user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    self.users.pop(queue.user_id, None)
+
+    def _index(self, queue: ConnectionQueue):
+        subscription = queue.subscription
+        if subscription is None:
+            self.unfiltered.add(queue)
+            return
+        for event_type in subscription.types:
+            self.by_type.setdefault(event_type, set()).add(queue)
+        for prefix in subscription.prefixes:
+            self.by_prefix.setdefault(prefix, set()).add(queue)
+
+    def _unindex(self, queue: ConnectionQueue):
+        subscription = queue.subscription
+        if subscription is None:
+            self.unfiltered.discard(queue)
+            return
+        for event_type in subscription.types:
+            self._discard_indexed(self.by_type, event_type, queue)
+        for prefix in subscription.prefixes:
+            self._discard_indexed(self.by_prefix, prefix, queue)
+
+    @staticmethod
+    def _discard_indexed(index: dict[str, set[ConnectionQueue]], key: str, queue):
+        queues = index.get(key)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                index.pop(key, None)
+
+    def recipients(self, event: Event) -> tuple[ConnectionQueue, ...]:
+        """Queues that should receive the event (snapshot, safe to iterate across threads)"""
+        if event.scope == Scope.PUBLIC:
+            return self._public_recipients(event.type)
+        if event.scope == Scope.USER and event.user_id is not None:
+            queues = tuple(self.users.get(str(event.user_id), ()))
+            return tuple(queue for queue in queues if queue.subscribed_to(event.type))
+        return ()
+
+    def _public_recipients(self, event_type: str) -> tuple[ConnectionQueue, ...]:
+        subscribed = [
+            queues for prefix, queues in tuple(self.by_prefix.items())
+            if event_type.startswith(prefix)
+        ]
+        typed = self.by_type.get(event_type)
+        if typed is not None:
+            subscribed.append(typed)
+        if not subscribed:
+            return tuple(self.unfiltered)
+        recipients = set(self.unfiltered)
+        for queues in subscribed:
+            recipients.update(queues)
+        return tuple(recipients)
+
+    def deliver(self, event: Event):
+        """
+        Offer the event to every recipient queue, full ones apply their overflow policy.
+        Queues of event loops in other threads get it in one callback per loop, instead
+        of a thread-safe wakeup per queue.
+        """
+        started = metrics.start()
+        handovers = {}
+        for queue in self.recipients(event):
+            loop = queue.handover_loop()
+            if loop is not None:
+                handovers.setdefault(loop, []).append(queue)
+            elif queue.offer(event) and queue.overflowed:
+                self.discard(queue)
+        for loop, queues in handovers.items():
+            with contextlib.suppress(RuntimeError):  # Loop closed, its streams are gone
+                loop.call_soon_threadsafe(self._offer_all, event, queues)
+        metrics.FANOUT_SECONDS.observe_since(started)
+
+    def _offer_all(self, event: Event, queues: list[ConnectionQueue]):
+        """Offer on the queues' own loop"""
+        for queue in queues:
+            if queue.offer(event) and queue.overflowed:
+                self.discard(queue)
+
+    def clear(self):
+        with self._lock:
+            self.users.clear()
+            self.broadcast.clear()
+            self.unfiltered.clear()
+            self.by_type.clear()
+            self.by_prefix.clear()
+            self.disconnected = 0
+            self._closed_dropped = 0
+
+    def __iter__(self):
+        return iter(tuple(self.broadcast))
+
+    def __len__(self):
+        return len(self.broadcast)
+
+    def __contains__(self, queue):
+        return queue in self.broadcast
+
+
+sse_connections = ConnectionRegistry()
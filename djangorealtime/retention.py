@@ -0,0 +1,168 @@
+"""
+Expiry of stored events and their activities.
+
+Retention is set per event type (RETENTION_BY_TYPE), else per scope (RETENTION_BY_SCOPE),
+else RETENTION_DAYS. `prune()` deletes expired events in small batches, walking them by
+(created_at, id) so each batch starts where the last one ended instead of scanning deleted
+rows again, and sleeps between batches so it doesn't starve the database. Used by the
+`djr_prune` command.
+"""
+import contextlib
+import gzip
+import json
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from .config import Config
+from .models import EventActivity
+from .utils import get_event_model, logger
+
+ACTIVITY_FIELDS = ('id', 'event_id', 'status', 'user_id', 'created_at')
+
+
+@dataclass
+class RetentionRule:
+    label: str  # e.g. 'type=cursor_moved', 'scope=public' or 'default'
+    condition: Q
+    days: int
+
+    def expired(self, now: datetime) -> QuerySet:
+        cutoff = now - timedelta(days=self.days)
+        return get_event_model().objects.filter(self.condition, created_at__lt=cutoff)
+
+
+@dataclass
+class PruneResult:
+    events: int = 0
+    activities: int = 0
+    archive: str | None = None  # Path of the archive, when archiving
+
+
+def retention_rules(days: int | None = None) -> list[RetentionRule]:
+    """
+    Rules from the RETENTION_* settings, most specific first. Each event falls under one rule.
+    `days` overrides RETENTION_DAYS. Types, scopes or a default set to None are kept forever.
+    """
+    days = Config.RETENTION_DAYS if days is None else days
+    by_type = Config.RETENTION_BY_TYPE
+    by_scope = Config.RETENTION_BY_SCOPE
+
+    rules = [
+        RetentionRule(f'type={event_type}', Q(type=event_type), type_days)
+        for event_type, type_days in by_type.items()
+    ]
+    rules += [
+        RetentionRule(f'scope={scope}', Q(scope=scope) & ~Q(type__in=by_type), scope_days)
+        for scope, scope_days in by_scope.items()
+    ]
+    rules.append(RetentionRule('default', ~Q(type__in=by_type) & ~Q(scope__in=by_scope), days))
+    return [rule for rule in rules if rule.days is not None]
+
+
+def _archive_path(directory: str, now: datetime) -> str:
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'djangorealtime-{now:%Y%m%dT%H%M%S}.jsonl.gz')
+
+
+def _archive_rows(archive, table: str, rows):
+    for row in rows:
+        archive.write(json.dumps({'table': table, **row}, cls=DjangoJSONEncoder))
+        archive.write('\n')
+
+
+def _keyset_batches(queryset: QuerySet, fields: tuple, batch_size: int):
+    """Rows of the queryset in (created_at, id) order, batch_size at a time"""
+    queryset = queryset.order_by('created_at', 'id')
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            page = page.filter(
+                Q(created_at__gt=last['created_at'])
+                | Q(created_at=last['created_at'], id__gt=last['id'])
+            )
+        rows = list(page.values(*fields)[:batch_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]
+
+
+def _archive_batch(archive, rows: list[dict], event_ids: list, chunk_size: int):
+    """Events, then their activities, one JSON line each, flushed before they're deleted"""
+    _archive_rows(archive, 'event', rows)
+    # An event can have an activity per recipient, stream them with a server-side cursor
+    activities = (
+        EventActivity.objects.filter(event_id__in=event_ids)
+        .order_by('id').values(*ACTIVITY_FIELDS).iterator(chunk_size=chunk_size)
+    )
+    _archive_rows(archive, 'activity', activities)
+    archive.flush()
+
+
+def prune(
+        days: int | None = None,
+        batch_size: int | None = None,
+        sleep: float | None = None,
+        archive_dir: str | None = None,
+        now: datetime | None = None,
+        progress: Callable[[str, int], None] | None = None,
+) -> PruneResult:
+    """
+    Delete expired events and their activities.
+
+    Args:
+        days: Overrides RETENTION_DAYS for events without a type or scope rule
+        batch_size: Events deleted per batch (default: PRUNE_BATCH_SIZE)
+        sleep: Seconds to wait between batches (default: PRUNE_SLEEP)
+        archive_dir: Write the rows to a gzip JSONL archive in this directory before deleting
+        now: Expire relative to this time instead of now
+        progress: Called with the rule label and events deleted under it so far, per batch
+
+    Returns:
+        PruneResult with the deleted counts and the archive path
+    """
+    batch_size = batch_size or Config.PRUNE_BATCH_SIZE
+    sleep = Config.PRUNE_SLEEP if sleep is None else sleep
+    now = now or timezone.now()
+    model = get_event_model()
+    fields = tuple(field.attname for field in model._meta.concrete_fields)
+
+    result = PruneResult()
+    with contextlib.ExitStack() as stack:
+        archive = None
+        if archive_dir:
+            result.archive = _archive_path(archive_dir, now)
+            archive = stack.enter_context(gzip.open(result.archive, 'at', encoding='utf-8'))
+
+        for rule in retention_rules(days):
+            deleted = 0
+            for rows in _keyset_batches(rule.expired(now), fields, batch_size):
+                event_ids = [row['id'] for row in rows]
+                if archive:
+                    _archive_batch(archive, rows, event_ids, batch_size)
+                activities = EventActivity.objects.filter(event_id__in=event_ids)
+                result.activities += activities.delete()[0]
+                model.objects.filter(id__in=event_ids).delete()
+                deleted += len(event_ids)
+                if progress:
+                    progress(rule.label, deleted)
+                if sleep:
+                    time.sleep(sleep)
+            result.events += deleted
+            if deleted:
+                logger.info(f"Pruned {deleted} events older than {rule.days} days ({rule.label})")
+    return result
+
+
+def count_expired(days: int | None = None, now: datetime | None = None) -> dict[str, int]:
+    """Events prune() would delete, by rule label"""
+    now = now or timezone.now()
+    return {rule.label: rule.expired(now).count() for rule in retention_rules(days)}
@@ -0,0 +1,130 @@
+"""
+Spillover of events too large for a NOTIFY payload.
+
+The publisher sends a reference (id, type, scope and user_id) instead of an oversized
+stored event, and listeners fetch the referenced bodies from the event table: one query
+per payload for the ones missing from a short-lived LRU cache, so a body is fetched once
+per node however many listeners and connections it has. Payloads under the limit are
+unchanged and never touch the database.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from . import codecs
+from .config import Config
+from .structs import Event, Scope
+from .utils import get_event_model, logger
+
+REFERENCE_KEY = 'ref'
+
+
+@dataclass
+class Reference:
+    """Stands in for a spilled event between decoding and resolve()"""
+    id: str
+    type: str
+    scope: Scope
+    user_id: str | None = None
+
+
+def reference_payload(event: Event) -> str:
+    """Payload referencing the stored event. Raises ValueError if the event isn't stored."""
+    if event.skip_storage or not Config.ENABLE_EVENT_STORAGE:
+        raise ValueError(
+            f"Event {event.type} is over the NOTIFY payload limit and can't spill over "
+            f"without event storage"
+        )
+    return codecs.encode({
+        REFERENCE_KEY: 1,
+        'id': event.id,
+        'type': event.type,
+        'scope': event.scope,
+        'user_id': event.user_id,
+    })
+
+
+def decode_item(data: dict) -> Event | Reference:
+    if data.get(REFERENCE_KEY):
+        return Reference(data['id'], data['type'], data['scope'], data.get('user_id'))
+    return Event.from_dict(data)
+
+
+class BodyCache:
+    """Thread-safe LRU of fetched events, entries expire after SPILLOVER_CACHE_TTL seconds"""
+
+    def __init__(self):
+        self._events: OrderedDict[str, tuple[float, Event]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, event_id: str) -> Event | None:
+        with self._lock:
+            entry = self._events.get(event_id)
+            if entry is None:
+                return None
+            stored_at, event = entry
+            if time.monotonic() - stored_at > Config.SPILLOVER_CACHE_TTL:
+                del self._events[event_id]
+                return None
+            self._events.move_to_end(event_id)
+            return event
+
+    def put(self, event: Event):
+        with self._lock:
+            self._events[event.id] = (time.monotonic(), event)
+            self._events.move_to_end(event.id)
+            while len(self._events) > Config.SPILLOVER_CACHE_SIZE:
+                self._events.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+    def __len__(self):
+        return len(self._events)
+
+
+body_cache = BodyCache()
+
+
+def _fetch(event_ids: list[str]) -> dict[str, Event]:
+    rows = get_event_model().objects.filter(id__in=event_ids).only(
+        'id', 'type', 'scope', 'detail', 'user_id'
+    )
+    return {row.id: row.as_event() for row in rows}
+
+
+def resolve(items: list[Event | Reference]) -> list[Event]:
+    """
+    Events with references replaced by their stored events, in order. Missing bodies are
+    fetched with one query. Each caller gets its own copy, hooks may change them.
+    """
+    references = [item.id for item in items if isinstance(item, Reference)]
+    if not references:
+        return items
+
+    events = {}
+    missing = []
+    for event_id in references:
+        event = body_cache.get(event_id)
+        if event is None:
+            missing.append(event_id)
+        else:
+            events[event_id] = event
+    if missing:
+        fetched = _fetch(missing)
+        for event in fetched.values():
+            body_cache.put(event)
+        events.update(fetched)
+
+    resolved = []
+    for item in items:
+        if not isinstance(item, Reference):
+            resolved.append(item)
+        elif item.id in events:
+            resolved.append(copy.deepcopy(events[item.id]))
+        else:
+            logger.warning(f"Spilled event {item.id} ({item.type}) not found in storage")
+    return resolved
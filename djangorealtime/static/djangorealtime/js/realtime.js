@@ -11,10 +11,28 @@
             const debug = options.debug || false;
 
             let retryCount = 0;
-            const eventSource = new EventSource(endpoint);
+            const params = [];
+            // Only receive these event types, e.g. ['chat_message', 'order_*']
+            if (options.types && options.types.length) {
+                const types = Array.isArray(options.types) ? options.types.join(',') : options.types;
+                params.push(`types=${encodeURIComponent(types)}`);
+            }
+            // Resume after a manual reconnect, the browser only sends Last-Event-ID on its own retries
+            if (options.lastEventId) {
+                params.push(`last_event_id=${encodeURIComponent(options.lastEventId)}`);
+            }
+            let url = endpoint;
+            if (params.length) {
+                const separator = endpoint.includes('?') ? '&' : '?';
+                url = `${endpoint}${separator}${params.join('&')}`;
+            }
+            const eventSource = new EventSource(url);
 
             eventSource.onmessage = function(event) {
                 retryCount = 0; // Reset on successful message
+                if (event.lastEventId) {
+                    options.lastEventId = event.lastEventId;
+                }
                 if (debug) {
                     console.log('DjangoRealtime - Received:', event.data);
                 }
@@ -1,12 +1,13 @@
 import json
 import sys
 import uuid
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from enum import Enum
 
-from django.apps import apps
-
+from . import codecs
+from .activity import COUNTERS, OFF, activity_mode, activity_writer
 from .config import Config
+from .utils import get_event_model
 
 # StrEnum is only available in Python 3.11+
 if sys.version_info >= (3, 11):
@@ -25,15 +26,74 @@ class Struct:
             result = {k: v for k, v in result.items() if not k.startswith('_')}
         return result
 
+    def _fields(self, exclude_private=True) -> dict:
+        """Field values, without the deep copy of to_dict(): for encoding only"""
+        return {
+            name: getattr(self, name) for name in self.__dataclass_fields__
+            if not (exclude_private and name.startswith('_'))
+        }
+
     def to_json(self, exclude_private=True):
-        return json.dumps(self.to_dict(exclude_private=exclude_private))
+        return json.dumps(self._fields(exclude_private=exclude_private))
+
+    def to_payload(self) -> str:
+        """NOTIFY payload in the CODEC wire format"""
+        return codecs.encode(self._fields())
 
     @classmethod
     def from_json(cls, json_str):
         data = json.loads(json_str)
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data):
         return cls(**data)
 
 
+class Detail(dict):
+    """Event detail that counts its changes, so a cached SSE frame knows when it's stale"""
+    version = 0
+
+    def _changed(self):
+        self.version += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __ior__(self, other):
+        result = super().__ior__(other)
+        self._changed()
+        return result
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        self._changed()
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        self._changed()
+        return result
+
+    def setdefault(self, key, default=None):
+        result = super().setdefault(key, default)
+        self._changed()
+        return result
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+
 class Scope(StrEnum):
     PUBLIC = 'public'
     USER = 'user'
@@ -62,37 +122,92 @@ class Event(Struct):
     user_id: str = None
     id: str = None
     skip_storage: bool = False
+    _sse_frame: tuple | None = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         if self.id is None:
             self.id = str(uuid.uuid4())
 
+    def __setattr__(self, name, value):
+        if name == 'detail' and type(value) is dict:
+            value = Detail(value)
+        if name in ('type', 'detail'):
+            super().__setattr__('_sse_frame', None)
+        super().__setattr__(name, value)
+
+    def sse_frame(self) -> str:
+        """
+        Encoded SSE frame for this event.
+        Encoded once and reused for every connection until type or detail is assigned, or
+        a top-level key of detail changes. Nested values changed in place aren't noticed.
+        """
+        version = getattr(self.detail, 'version', 0)
+        if self._sse_frame is not None and self._sse_frame[0] == version:
+            return self._sse_frame[1]
+
+        detail = self.detail or {}
+        frame = f"id: {self.id}\ndata: {codecs.sse_dumps({**detail, 'type': self.type})}\n\n"
+        self._sse_frame = (version, frame)
+        return frame
+
     def persist(self, status: Status = Status.NEW, private_data: dict | None = None):
         if self.skip_storage or not Config.ENABLE_EVENT_STORAGE:
             return None
-        event_model = apps.get_model(Config.EVENT_MODEL)
+        event_model = get_event_model()
+        return event_model.objects.create(**self._model_fields(status, private_data))
+
+    async def apersist(self, status: Status = Status.NEW, private_data: dict | None = None):
+        """Async version of persist, using the async ORM."""
+        if self.skip_storage or not Config.ENABLE_EVENT_STORAGE:
+            return None
+        event_model = get_event_model()
+        return await event_model.objects.acreate(**self._model_fields(status, private_data))
+
+    @classmethod
+    def persist_many(
+            cls,
+            events: list['Event'],
+            status: Status = Status.NEW,
+            private_data: dict | None = None
+    ):
+        """Store many events with a single bulk INSERT."""
+        events = [event for event in events if not event.skip_storage]
+        if not events or not Config.ENABLE_EVENT_STORAGE:
+            return []
+        event_model = get_event_model()
+        return event_model.objects.bulk_create([
+            event_model(**event._model_fields(status, private_data)) for event in events
+        ])
+
+    def _model_fields(self, status: Status, private_data: dict | None) -> dict:
         data_store = {}
         if private_data:
             data_store['private_data'] = private_data
-        m = event_model.objects.create(
-            id=self.id,
-            type=self.type,
-            scope=self.scope,
-            detail=self.detail,
-            user_id=self.user_id,
-            status=status.value,
-            data_store=data_store,
-        )
-        return m
+        return {
+            'id': self.id,
+            'type': self.type,
+            'scope': self.scope,
+            'detail': self.detail,
+            'user_id': self.user_id,
+            'status': status.value,
+            'data_store': data_store,
+        }
 
     def update_status(self, status: Status, user_id: str | None = None):
+        """
+        Record a status activity, or count it, depending on the event's activity mode.
+        Written to the DB in batches by the activity writer.
+        """
         if self.skip_storage or not Config.ENABLE_EVENT_STORAGE:
             return None
-        self.model().add_activity(status.value, user_id)
+        mode = activity_mode(self)
+        if mode == OFF:
+            return None
+        activity_writer.record(self.id, status.value, user_id, counter=mode == COUNTERS)
 
     def model(self):
         """Get the database model instance for this event."""
         if self.skip_storage or not Config.ENABLE_EVENT_STORAGE:
             return None
-        event_model = apps.get_model(Config.EVENT_MODEL)
+        event_model = get_event_model()
         return event_model.objects.get(id=self.id)
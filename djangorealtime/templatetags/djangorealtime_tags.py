@@ -32,14 +32,19 @@ def djangorealtime_js(auto_connect=True):
     return mark_safe(f'<script id="djangorealtime-js">\n{js_content_with_config}\n</script>')
 
 @register.simple_tag
-def djangorealtime_init(endpoint='/realtime/sse/', debug=False):
-    """Initialize DjangoRealtime connection with optional configuration"""
+def djangorealtime_init(endpoint='/realtime/sse/', debug=False, types=''):
+    """Initialize DjangoRealtime connection with optional configuration
+
+    Args:
+        types: Comma separated event types to receive, `order_*` matches a prefix (default: all)
+    """
     debug_str = 'true' if debug else 'false'
     script = f"""
     <script>
         document.addEventListener('DOMContentLoaded', function() {{
             window.djangoRealtimeConnection = DjangoRealtime.connect({{
                 endpoint: '{endpoint}',
+                types: '{types}',
                 debug: {debug_str},
                 onConnect: function() {{
                     console.log('DjangoRealtime connected');
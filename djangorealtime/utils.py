@@ -1,3 +1,28 @@
 import logging
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from functools import cache
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+from .config import Config
 
 logger = logging.getLogger('djangorealtime')
+
+
+@cache
+def _get_model(label):
+    return apps.get_model(label)
+
+
+def get_event_model():
+    """Configured event model class (EVENT_MODEL), looked up once per label."""
+    return _get_model(Config.EVENT_MODEL)
+
+
+def datetime_from_timestamp(timestamp: float) -> datetime:
+    """Unix timestamp to a datetime comparable with DateTimeFields (aware if USE_TZ)."""
+    value = datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+    return value if settings.USE_TZ else timezone.make_naive(value)
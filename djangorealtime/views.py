@@ -1,29 +1,34 @@
 import asyncio
-import contextlib
 import json
+import time
+from datetime import timedelta
 
 from django.db import connection
-from django.http import StreamingHttpResponse
+from django.db.models import Q
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 
+from djangorealtime import metrics
 from djangorealtime.config import Config
-from djangorealtime.hooks import execute_before_send_hook
-from djangorealtime.publisher import subscribe
-from djangorealtime.queues import RequestQueue
+from djangorealtime.heartbeat import HeartbeatTicker, sync_heartbeat
+from djangorealtime.hooks import execute_before_send_hook, execute_on_receive_hook
+from djangorealtime.listener import AsyncListener
+from djangorealtime.queues import HEARTBEAT, RequestQueue, Subscription, SyncRequestQueue
+from djangorealtime.registry import sse_connections
+from djangorealtime.signals import internal_signal
 from djangorealtime.structs import Event, Scope, Status
 from djangorealtime.thread_pool import run_in_thread
+from djangorealtime.utils import get_event_model, logger
 
-sse_connections = set()
 
-
-@subscribe
-def _on_event(event: Event):
+@receiver(internal_signal, weak=False)
+def _on_event(sender, event: Event, sse_delivered=False, **kwargs):
     """Handle events and broadcast to connected clients"""
-    if event.scope == Scope.SYSTEM:
-        return
-    for queue in sse_connections:
-        if queue.should_receive(event):
-            with contextlib.suppress(asyncio.QueueFull):
-                queue.put_nowait(event)
+    # The async listener delivers to SSE connections itself, on the event loop
+    if not sse_delivered:
+        sse_connections.deliver(event)
+    event.update_status(status=Status.DISPATCHED)
 
 
 def _get_user_id(request):
@@ -33,6 +38,74 @@ def _get_user_id(request):
     return str(user_id) if user_id is not None else None
 
 
+def _get_last_event_id(request):
+    """Last-Event-ID header of a reconnecting EventSource, or last_event_id query param"""
+    headers = getattr(request, 'headers', None)
+    last_event_id = headers.get('Last-Event-ID') if headers is not None else None
+    if not last_event_id and hasattr(request, 'GET'):
+        last_event_id = request.GET.get('last_event_id')
+    return last_event_id if isinstance(last_event_id, str) and last_event_id else None
+
+
+def _get_subscription(request) -> Subscription | None:
+    """Event types from the types query param, e.g. ?types=chat_message,order_*"""
+    types = request.GET.get('types') if hasattr(request, 'GET') else None
+    return Subscription.parse(types) if isinstance(types, str) else None
+
+
+def _subscription_filter(subscription: Subscription) -> Q:
+    condition = Q(type__in=subscription.types)
+    for prefix in subscription.prefixes:
+        condition |= Q(type__startswith=prefix)
+    return condition
+
+
+def _missed_events(last_event_id, user_id, subscription: Subscription | None = None):
+    """
+    Stored public and user events created after the last event the client received,
+    of the subscribed types. Bounded by SSE_REPLAY_WINDOW seconds and SSE_REPLAY_LIMIT events.
+    They go through ON_RECEIVE_HOOK like live events, so aborted events aren't replayed.
+    """
+    if not Config.ENABLE_EVENT_STORAGE:
+        return []
+    try:
+        event_model = get_event_model()
+        last_created_at = (
+            event_model.objects.filter(id=last_event_id)
+            .values_list('created_at', flat=True)
+            .first()
+        )
+        if last_created_at is None:
+            return []
+
+        since = max(last_created_at, timezone.now() - timedelta(seconds=Config.SSE_REPLAY_WINDOW))
+        audience = Q(scope=Scope.PUBLIC)
+        if user_id is not None:
+            audience |= Q(scope=Scope.USER, user_id=user_id)
+        if subscription is not None:
+            audience &= _subscription_filter(subscription)
+        rows = (
+            event_model.objects
+            .filter(audience, created_at__gte=since)
+            .exclude(id=last_event_id)
+            .order_by('created_at')
+            .only('id', 'type', 'scope', 'detail', 'user_id')
+        )[:Config.SSE_REPLAY_LIMIT]
+        events = []
+        for row in rows:
+            try:
+                event = execute_on_receive_hook(row.as_event())
+            except Exception as e:
+                logger.error(f"Error handling replayed event: {e}", exc_info=True)
+                continue
+            if event is not None:
+                events.append(event)
+        return events
+    finally:
+        if Config.CLOSE_DB_PER_EVENT:
+            connection.close()
+
+
 def _process_event(event, request, user_id):
     try:
         processed = execute_before_send_hook(event, request)
@@ -41,9 +114,7 @@ def _process_event(event, request, user_id):
 
         event.update_status(status=Status.SENT, user_id=user_id)
 
-        detail = processed.detail or {}
-        detail['type'] = processed.type
-        return f"data: {json.dumps(detail)}\n\n"
+        return processed.sse_frame()
     finally:
         if Config.CLOSE_DB_PER_EVENT:
             connection.close()
@@ -51,26 +122,54 @@ def _process_event(event, request, user_id):
 
 async def event_stream(request):
     request_user_id = await run_in_thread(_get_user_id, request)
-    queue = RequestQueue(user_id=request_user_id)
+    queue = RequestQueue(user_id=request_user_id, subscription=_get_subscription(request))
+    ticker = HeartbeatTicker.for_loop()
+    # Register before replaying, so events published meanwhile are queued
     sse_connections.add(queue)
 
     try:
         yield f"data: {json.dumps({'type': 'connected'})}\n\n"
+
+        replayed = set()
+        last_event_id = _get_last_event_id(request)
+        if last_event_id:
+            for event in await run_in_thread(
+                _missed_events, last_event_id, request_user_id, queue.subscription
+            ):
+                replayed.add(event.id)
+                message = await run_in_thread(_process_event, event, request, request_user_id)
+                if message:
+                    metrics.EVENTS_SENT.inc()
+                    yield message
+
+        loop = asyncio.get_running_loop()
+        ticker.add(queue)
         while True:
-            try:
-                event = await asyncio.wait_for(queue.get(), timeout=Config.HEARTBEAT_INTERVAL)
-            except asyncio.TimeoutError:
+            event = await queue.get()
+            if event is HEARTBEAT:
                 yield ": heartbeat\n\n"
                 continue
 
+            if queue.overflowed:
+                # Too slow to keep up, end the stream so the client resumes from Last-Event-ID
+                break
+
+            if event.id in replayed:
+                continue
+
             message = await run_in_thread(_process_event, event, request, request_user_id)
             if message:
+                queue.last_sent = loop.time()
+                metrics.EVENTS_SENT.inc()
                 yield message
     finally:
+        ticker.discard(queue)
         sse_connections.discard(queue)
 
 
 async def sse_view(request):
+    if Config.AUTO_LISTEN and Config.LISTENER_MODE == 'async':
+        AsyncListener.ensure_started()
     return StreamingHttpResponse(
         event_stream(request),
         content_type='text/event-stream',
@@ -78,25 +177,64 @@ async def sse_view(request):
     )
 
 
-def async_generator_to_sync(async_gen_func):  # pragma: no cover
-    def wrapper(*args, **kwargs):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+def metrics_view(request):
+    """
+    Metrics in Prometheus text format. Not routed by default, add it to your urls
+    (behind auth if needed). Returns 404 unless METRICS_ENABLED.
+    """
+    if not metrics.enabled():
+        raise Http404
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def event_stream_sync(request):
+    """
+    Sync version of event_stream for WSGI servers. Runs entirely in the request's
+    thread: it blocks on a thread-safe queue, woken by events and the shared heartbeat.
+    """
+    request_user_id = _get_user_id(request)
+    queue = SyncRequestQueue(user_id=request_user_id, subscription=_get_subscription(request))
+    sse_connections.add(queue)
+    sync_heartbeat.add(queue)
+
+    try:
+        yield f"data: {json.dumps({'type': 'connected'})}\n\n"
+
+        replayed = set()
+        last_event_id = _get_last_event_id(request)
+        if last_event_id:
+            for event in _missed_events(last_event_id, request_user_id, queue.subscription):
+                replayed.add(event.id)
+                message = _process_event(event, request, request_user_id)
+                if message:
+                    metrics.EVENTS_SENT.inc()
+                    yield message
+
+        while True:
+            event = queue.get()
+            if event is HEARTBEAT:
+                yield ": heartbeat\n\n"
+                continue
 
-        try:
-            async_gen = async_gen_func(*args, **kwargs)
-            while True:
-                chunk = loop.run_until_complete(async_gen.__anext__())
-                yield chunk
-        finally:
-            loop.close()
+            if queue.overflowed:
+                break
+
+            if event.id in replayed:
+                continue
 
-    return wrapper
+            message = _process_event(event, request, request_user_id)
+            if message:
+                queue.last_sent = time.monotonic()
+                metrics.EVENTS_SENT.inc()
+                yield message
+    finally:
+        sync_heartbeat.discard(queue)
+        sse_connections.discard(queue)
 
 
-def sse_view_sync(request):  # pragma: no cover
+def sse_view_sync(request):
     return StreamingHttpResponse(
-        async_generator_to_sync(event_stream)(request),
+        event_stream_sync(request),
         content_type='text/event-stream',
         headers={'Cache-Control': 'no-cache'}
     )
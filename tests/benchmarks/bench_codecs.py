@@ -0,0 +1,74 @@
+"""
+Codec benchmark: NOTIFY payload encode/decode rate and size per codec, and SSE frame encoding.
+
+Run with: python -m pytest tests/benchmarks/bench_codecs.py -s
+"""
+import json
+import time
+from dataclasses import asdict
+from unittest.mock import patch
+
+import pytest
+
+from djangorealtime import codecs
+from djangorealtime.backends.postgresql import NOTIFY_PAYLOAD_LIMIT, batch_payloads
+from djangorealtime.config import Config
+from djangorealtime.listener import Listener
+from djangorealtime.structs import Event, Scope
+
+ITERATIONS = 20000
+DETAIL = {'order_id': 12345, 'status': 'shipped', 'items': list(range(20)), 'total': 99.5}
+
+
+def _installed(name):
+    try:
+        codecs.get_codec(name)
+    except ImportError:
+        return False
+    return True
+
+
+def _event():
+    return Event(type='order_updated', scope=Scope.USER, user_id='42', detail=dict(DETAIL))
+
+
+def _rate(function):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        function()
+    return ITERATIONS / (time.perf_counter() - start)
+
+
+def test_previous_encoding():
+    """asdict() deep-copies detail before json.dumps"""
+    event = _event()
+    rate = _rate(lambda: json.dumps(asdict(event)))
+    print(f"\nasdict + json.dumps: {rate:,.0f} events/s")
+
+
+@pytest.mark.parametrize('name', list(codecs.CODECS))
+def test_codec(name):
+    if not _installed(name):
+        pytest.skip(f"{name} is not installed")
+    event = _event()
+    with patch.object(Config, 'CODEC', name):
+        payload = event.to_payload()
+        encode = _rate(event.to_payload)
+        decode = _rate(lambda: Listener._decode(payload))
+        per_notify = len(Listener._decode(
+            batch_payloads([payload] * 1000, limit=NOTIFY_PAYLOAD_LIMIT)[0]
+        ))
+    print(
+        f"\n{name}: encode {encode:,.0f}/s, decode {decode:,.0f}/s, "
+        f"{len(payload)} bytes, {per_notify} events per NOTIFY"
+    )
+
+
+@pytest.mark.parametrize('name', ['json', 'orjson'])
+def test_sse_frame(name):
+    if not _installed(name):
+        pytest.skip(f"{name} is not installed")
+    with patch.object(Config, 'SSE_CODEC', name):
+        # A new event per frame, the per-event cache would hide the encoding cost
+        rate = _rate(lambda: _event().sse_frame())
+    print(f"\nSSE frames with {name}: {rate:,.0f}/s")
@@ -0,0 +1,21 @@
+"""
+End-to-end benchmark: publish to in-process SSE clients, across user and global scopes.
+
+Run with: python -m pytest tests/benchmarks/bench_end_to_end.py -s
+Or against your own project: python manage.py djr_benchmark --clients 1000 --rate 200
+"""
+import pytest
+
+from djangorealtime.benchmark import LISTENER_MODES, run_benchmark
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@pytest.mark.parametrize('listener', LISTENER_MODES)
+@pytest.mark.parametrize('storage, hook', [(True, False), (False, False), (True, True)])
+async def test_end_to_end(storage, hook, listener):
+    result = await run_benchmark(
+        clients=500, rate=100, duration=3, storage=storage, hook=hook, listener=listener
+    )
+    print(f"\n{result.to_json()}")
+    assert result.delivered == result.expected_deliveries
@@ -0,0 +1,117 @@
+"""
+Fan-out benchmark: indexed registry lookup vs scanning every connection, and delivery
+from the threaded listener to streams on an event loop.
+
+Run with: python -m pytest tests/benchmarks/bench_fanout.py -s
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from djangorealtime.queues import RequestQueue, Subscription
+from djangorealtime.registry import ConnectionRegistry
+from djangorealtime.structs import Event, Scope
+
+EVENTS = 1000
+
+
+def _registry(connections):
+    registry = ConnectionRegistry()
+    for i in range(connections):
+        registry.add(RequestQueue(user_id=str(i) if i % 10 else None))
+    return registry
+
+
+def _scan(registry, event):
+    return [queue for queue in registry if queue.should_receive(event)]
+
+
+@pytest.mark.parametrize('connections', [1000, 20000])
+def test_user_event_fanout(connections):
+    registry = _registry(connections)
+    events = [
+        Event(type='notification', scope=Scope.USER, user_id=str(i % connections), detail={})
+        for i in range(EVENTS)
+    ]
+
+    start = time.perf_counter()
+    for event in events:
+        _scan(registry, event)
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for event in events:
+        registry.recipients(event)
+    indexed = time.perf_counter() - start
+
+    print(
+        f"\n{connections} connections, {EVENTS} user events: "
+        f"scan {EVENTS / scan:,.0f} ev/s, indexed {EVENTS / indexed:,.0f} ev/s"
+    )
+    assert indexed < scan
+
+
+@pytest.mark.parametrize('connections', [1000, 20000])
+def test_subscribed_public_fanout(connections):
+    """Most connections subscribed to a few types, public events of other types skip them"""
+    registry = ConnectionRegistry()
+    for i in range(connections):
+        subscription = Subscription.parse(f'chat_message,order_*,type_{i % 60}') if i % 10 else None
+        registry.add(RequestQueue(user_id=str(i), subscription=subscription))
+    events = [Event(type=f'type_{i % 100}', scope=Scope.PUBLIC, detail={}) for i in range(EVENTS)]
+
+    start = time.perf_counter()
+    for event in events:
+        _scan(registry, event)
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    offered = sum(len(registry.recipients(event)) for event in events)
+    indexed = time.perf_counter() - start
+
+    print(
+        f"\n{connections} connections, {EVENTS} public events: "
+        f"scan {EVENTS / scan:,.0f} ev/s, indexed {EVENTS / indexed:,.0f} ev/s, "
+        f"{offered / EVENTS:,.0f} recipients per event"
+    )
+    assert indexed < scan
+
+
+@pytest.mark.parametrize('connections', [1000, 10000])
+def test_cross_thread_deliver(connections):
+    """deliver() from a listener thread to streams on a loop: per queue vs one handover per loop"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    async def open_streams():
+        return [RequestQueue(user_id=None, maxsize=0) for _ in range(connections)]
+
+    registry = ConnectionRegistry()
+    for queue in asyncio.run_coroutine_threadsafe(open_streams(), loop).result():
+        registry.add(queue)
+    event = Event(type='notification', scope=Scope.PUBLIC, detail={})
+    rounds = 20
+
+    def timed(deliver):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            deliver()
+            # Wait for the loop to run the handed over offers
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), loop).result()
+        return (time.perf_counter() - start) / rounds * 1000
+
+    def per_queue():
+        for queue in registry.recipients(event):
+            queue.offer(event)
+
+    per_queue_ms = timed(per_queue)
+    grouped_ms = timed(lambda: registry.deliver(event))
+    loop.call_soon_threadsafe(loop.stop)
+
+    print(
+        f"\n{connections} connections, one public event from another thread: "
+        f"per queue {per_queue_ms:.1f} ms, one handover per loop {grouped_ms:.1f} ms"
+    )
+    assert grouped_ms < per_queue_ms
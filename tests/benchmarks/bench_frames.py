@@ -0,0 +1,42 @@
+"""
+SSE frame encoding benchmark: per-connection json.dumps vs the per-event frame cache.
+
+Run with: python -m pytest tests/benchmarks/bench_frames.py -s
+"""
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from djangorealtime import views
+from djangorealtime.config import Config
+from djangorealtime.structs import Event, Scope
+
+DETAIL = {'message': 'x' * 512, 'items': list(range(50)), ':id': 42}
+
+
+def _encode_per_connection(event, request, user_id):
+    detail = dict(event.detail)
+    detail['type'] = event.type
+    return f"data: {json.dumps(detail)}\n\n"
+
+
+def _frames_per_second(process, connections):
+    event = Event(type='dashboard', scope=Scope.PUBLIC, detail=dict(DETAIL), skip_storage=True)
+    request = MagicMock()
+    start = time.perf_counter()
+    for _ in range(connections):
+        process(event, request, None)
+    return connections / (time.perf_counter() - start)
+
+
+@pytest.mark.parametrize('connections', [1, 1000, 10000])
+def test_frames_per_second(connections):
+    with patch.object(Config, 'CLOSE_DB_PER_EVENT', False):
+        before = _frames_per_second(_encode_per_connection, connections)
+        after = _frames_per_second(views._process_event, connections)
+    print(
+        f"\n{connections} connections: "
+        f"per-connection {before:,.0f} frames/s, cached {after:,.0f} frames/s"
+    )
@@ -0,0 +1,75 @@
+"""
+Heartbeat benchmark: event loop CPU for idle streams, wait_for timeout per stream vs one ticker.
+
+Run with: python -m pytest tests/benchmarks/bench_heartbeat.py -s
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from djangorealtime.config import Config
+from djangorealtime.heartbeat import HeartbeatTicker
+from djangorealtime.queues import HEARTBEAT, RequestQueue
+
+STREAMS = 10000
+INTERVAL = 0.5
+DURATION = 3
+
+
+async def _wait_for_stream(queue, beats):
+    """The previous event_stream loop"""
+    while True:
+        try:
+            await asyncio.wait_for(queue.get(), timeout=INTERVAL)
+        except asyncio.TimeoutError:  # noqa: PERF203
+            beats.append(1)
+
+
+async def _ticker_stream(queue, ticker, beats):
+    ticker.add(queue)
+    queue.last_sent -= INTERVAL
+    try:
+        while True:
+            if await queue.get() is HEARTBEAT:
+                beats.append(1)
+    finally:
+        ticker.discard(queue)
+
+
+async def _cpu(make_stream):
+    beats = []
+    tasks = [
+        asyncio.create_task(make_stream(RequestQueue(user_id=None), beats)) for _ in range(STREAMS)
+    ]
+    await asyncio.sleep(INTERVAL)  # Let every stream start
+    beats.clear()
+    start = time.process_time()
+    await asyncio.sleep(DURATION)
+    cpu = time.process_time() - start
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return cpu, len(beats)
+
+
+def _per_beat(cpu, beats):
+    return f"{cpu / beats * 1e6:.1f}us per heartbeat ({beats} heartbeats)"
+
+
+@pytest.mark.asyncio
+async def test_idle_stream_cpu():
+    with patch.object(Config, 'HEARTBEAT_INTERVAL', INTERVAL):
+        wait_for_cpu, wait_for_beats = await _cpu(_wait_for_stream)
+        ticker = HeartbeatTicker()
+        ticker_cpu, ticker_beats = await _cpu(
+            lambda queue, beats: _ticker_stream(queue, ticker, beats)
+        )
+
+    print(
+        f"\n{STREAMS} idle streams, {DURATION}s at {INTERVAL}s heartbeat: "
+        f"wait_for {wait_for_cpu:.2f}s CPU, {_per_beat(wait_for_cpu, wait_for_beats)} | "
+        f"ticker {ticker_cpu:.2f}s CPU, {_per_beat(ticker_cpu, ticker_beats)}"
+    )
+    assert ticker_cpu / ticker_beats < wait_for_cpu / wait_for_beats
@@ -0,0 +1,58 @@
+"""
+Listener latency benchmark: publish to SSE queue, threaded listener vs async listener.
+
+Run with: python -m pytest tests/benchmarks/bench_listener.py -s
+"""
+import asyncio
+import statistics
+import time
+
+import pytest
+
+from djangorealtime import Listener, apublish, views  # noqa: F401, views registers SSE fan-out
+from djangorealtime.listener import AsyncListener
+from djangorealtime.queues import RequestQueue
+from djangorealtime.registry import sse_connections
+
+EVENTS = 200
+
+
+async def _latencies():
+    queue = RequestQueue(user_id='bench')
+    sse_connections.add(queue)
+    latencies = []
+    try:
+        for i in range(EVENTS):
+            start = time.perf_counter()
+            await apublish('bench', 'bench', {'n': i})
+            # Poll, the threaded listener puts from another thread and can't wake the loop
+            while queue.empty():
+                await asyncio.sleep(0.0001)
+            queue.get_nowait()
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        sse_connections.discard(queue)
+    return latencies
+
+
+def _summary(latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99)]
+    return f"p50 {statistics.median(latencies):.3f}ms, p99 {p99:.3f}ms"
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_listener_latency():
+    # Async first: the threaded listener can't be stopped once started
+    listener = AsyncListener()
+    listener.start()
+    await asyncio.sleep(0.2)
+    async_mode = await _latencies()
+    listener.stop()
+
+    Listener().start()
+    await asyncio.sleep(0.2)
+    thread_mode = await _latencies()
+
+    print(f"\n{EVENTS} events: thread {_summary(thread_mode)} | async {_summary(async_mode)}")
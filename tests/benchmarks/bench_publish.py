@@ -0,0 +1,38 @@
+"""
+Publish latency benchmark: ORM create + separate NOTIFY vs single-statement persist + NOTIFY.
+
+Run with: python -m pytest tests/benchmarks/bench_publish.py -s
+"""
+import statistics
+import time
+from unittest.mock import patch
+
+import pytest
+
+from djangorealtime import publish
+from djangorealtime.config import Config
+
+PUBLISHES = 500
+
+
+def _latencies():
+    latencies = []
+    for i in range(PUBLISHES):
+        start = time.perf_counter()
+        publish(i, 'bench', {'n': i})
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _summary(latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99)]
+    return f"p50 {statistics.median(latencies):.3f}ms, p99 {p99:.3f}ms"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_publish_latency():
+    with patch.object(Config, 'ORM_PUBLISH', True):
+        orm = _latencies()
+    fast = _latencies()
+    print(f"\n{PUBLISHES} publishes: ORM path {_summary(orm)} | single statement {_summary(fast)}")
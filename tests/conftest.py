@@ -49,6 +49,14 @@ def django_settings():
     yield settings
 
 
+@pytest.fixture(autouse=True)
+def reload_config():
+    """Undo Config.load() calls of tests that patch DJANGOREALTIME"""
+    yield
+    from djangorealtime.config import Config
+    Config.load()
+
+
 # Shared fixtures for end-to-end tests
 COLLECTED_EVENTS = []
 
@@ -0,0 +1,135 @@
+from unittest.mock import patch
+
+import pytest
+
+from djangorealtime.activity import ActivityWriter, activity_mode
+from djangorealtime.config import Config
+from djangorealtime.models import Event as EventModel
+from djangorealtime.structs import Event, Scope, Status
+
+
+@pytest.fixture()
+def persisted_event():
+    event = Event(type='page_imported', scope=Scope.PUBLIC, detail={})
+    event.persist()
+    return event
+
+
+@pytest.fixture()
+def writer():
+    writer = ActivityWriter()
+    # Keep the background thread out of the way, tests flush explicitly
+    writer._ensure_started = lambda: None
+    return writer
+
+
+class TestAddActivities:
+    @pytest.fixture()
+    def model(self, persisted_event):
+        EventModel.add_activities([
+            (persisted_event.id, Status.DISPATCHED.value, None),
+            (persisted_event.id, Status.SENT.value, '1'),
+            (persisted_event.id, Status.SENT.value, '2'),
+        ])
+        return EventModel.objects.get(id=persisted_event.id)
+
+    @pytest.mark.django_db
+    def test_activities_written(self, model):
+        assert model.activities.count() == 3
+
+    @pytest.mark.django_db
+    def test_status_progressed_to_highest(self, model):
+        assert model.status == Status.SENT
+
+    @pytest.mark.django_db
+    def test_status_never_regresses(self, model):
+        EventModel.add_activities([(model.id, Status.DISPATCHED.value, None)])
+        model.refresh_from_db()
+        assert model.status == Status.SENT
+
+
+class TestActivityWriter:
+    @pytest.mark.django_db
+    def test_flush_writes_buffer(self, writer, persisted_event):
+        writer.record(persisted_event.id, Status.SENT.value, 1)
+        writer.record(persisted_event.id, Status.SENT.value, 2)
+        assert writer.flush() == 2
+        assert EventModel.objects.get(id=persisted_event.id).activities.count() == 2
+
+    def test_full_buffer_drops(self, writer):
+        with patch.object(Config, 'ACTIVITY_BUFFER_SIZE', 2):
+            results = [writer.record('id', Status.SENT.value) for _ in range(3)]
+        assert results == [True, True, False]
+        assert writer.dropped == 1
+
+
+class TestAddCounts:
+    @pytest.fixture()
+    def model(self, persisted_event):
+        EventModel.add_counts({
+            (persisted_event.id, Status.DISPATCHED.value): 1,
+            (persisted_event.id, Status.SENT.value): 3,
+        })
+        EventModel.add_counts({(persisted_event.id, Status.SENT.value): 2})
+        return EventModel.objects.get(id=persisted_event.id)
+
+    @pytest.mark.django_db
+    def test_counts_incremented(self, model):
+        assert model.counts == {'dispatched': 1, 'sent': 5, 'delivered': 0, 'read': 0, 'error': 0}
+
+    @pytest.mark.django_db
+    def test_status_progressed(self, model):
+        assert model.status == Status.SENT
+
+    @pytest.mark.django_db
+    def test_no_activity_rows(self, model):
+        assert not model.activities.exists()
+
+
+class TestActivityModes:
+    @pytest.fixture()
+    def modes(self):
+        Config.ACTIVITY_MODE_BY_SCOPE = {'public': 'counters'}
+        Config.ACTIVITY_MODE_BY_TYPE = {'cursor_moved': 'off', 'invoice_paid': 'full'}
+
+    @pytest.fixture()
+    def recorded(self, modes, writer):
+        events = {
+            event_type: Event(type=event_type, scope=Scope.PUBLIC, detail={})
+            for event_type in ('page_imported', 'cursor_moved', 'invoice_paid')
+        }
+        with patch('djangorealtime.structs.activity_writer', writer):
+            for event in events.values():
+                event.persist()
+                for user_id in range(3):
+                    event.update_status(Status.SENT, user_id=user_id)
+        writer.flush()
+        return {event_type: EventModel.objects.get(id=e.id) for event_type, e in events.items()}
+
+    def test_mode_precedence(self, modes):
+        def mode(event_type, scope):
+            return activity_mode(Event(type=event_type, scope=scope, detail={}))
+
+        assert mode('cursor_moved', Scope.PUBLIC) == 'off'
+        assert mode('page_imported', Scope.PUBLIC) == 'counters'
+        assert mode('page_imported', Scope.USER) == 'full'
+
+    @pytest.mark.django_db
+    def test_counters(self, recorded):
+        model = recorded['page_imported']
+        assert (model.sent_count, model.activities.count(), model.status) == (3, 0, Status.SENT)
+
+    @pytest.mark.django_db
+    def test_off(self, recorded):
+        model = recorded['cursor_moved']
+        assert (model.sent_count, model.activities.count(), model.status) == (0, 0, Status.NEW)
+
+    @pytest.mark.django_db
+    def test_full_by_type(self, recorded):
+        model = recorded['invoice_paid']
+        assert (model.sent_count, model.activities.count(), model.status) == (0, 3, Status.SENT)
+
+    def test_counters_merged_in_buffer(self, writer):
+        for _ in range(100):
+            writer.record('id', Status.SENT.value, counter=True)
+        assert len(writer) == 1
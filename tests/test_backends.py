@@ -0,0 +1,234 @@
+import asyncio
+import errno
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+
+from djangorealtime.backends import relay as relay_module
+from djangorealtime.backends.memory import MemoryBackend
+from djangorealtime.backends.postgresql import PostgreSqlBackend
+from djangorealtime.backends.relay import RELAY_LISTENING, Relay, RelayBackend
+from djangorealtime.config import Config
+from djangorealtime.listener import AsyncListener, Listener
+from djangorealtime.queues import RequestQueue
+from djangorealtime.registry import sse_connections
+from djangorealtime.signals import internal_signal
+from djangorealtime.structs import Event, Scope
+
+
+@pytest.fixture()
+def backend():
+    return PostgreSqlBackend()
+
+
+class TestListenConnection:
+    def test_listen_dsn(self, backend):
+        with patch.object(Config, 'LISTEN_DSN', 'host=db.internal dbname=app keepalives_idle=5'):
+            params = backend.listen_connection_params()
+        assert (params['host'], params['dbname']) == ('db.internal', 'app')
+        assert params['keepalives'] == 1
+        assert params['keepalives_idle'] == '5'
+
+    def test_defaults_to_django_database(self, backend):
+        params = backend.listen_connection_params()
+        assert params['dbname'] == connection.settings_dict['NAME']
+        assert params['keepalives'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_listen_survives_idle_healthchecks(self, backend):
+        received = []
+        listening = backend.listen('djangorealtime')
+
+        with patch.object(Config, 'LISTEN_HEALTHCHECK_INTERVAL', 0.05):
+            thread = threading.Thread(target=lambda: received.append(next(listening)))
+            thread.start()
+            thread.join(0.3)  # Several idle health checks
+            PostgreSqlBackend().publish(Event(type='ping', scope=Scope.SYSTEM, detail={}))
+            thread.join(2)
+
+        backend._connection.close()
+        assert len(received) == 1
+        assert '"ping"' in received[0]
+
+
+MEMORY_BACKEND = {
+    'CLASS': 'djangorealtime.backends.memory.MemoryBackend',
+    'OPTIONS': {'channel': 'memory-test'},
+}
+
+
+class TestMemoryBackend:
+    @pytest.fixture()
+    def dispatched(self):
+        events = []
+
+        def on_event(sender, event, **kwargs):
+            events.append(event)
+
+        internal_signal.connect(on_event, weak=False)
+        yield events
+        internal_signal.disconnect(on_event)
+
+    @pytest.fixture()
+    def memory_listener(self, dispatched):
+        with patch.object(Config, 'BACKEND', MEMORY_BACKEND):
+            listener = Listener()
+        listener.start()
+        return listener
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delivered_on_commit(self, memory_listener, dispatched):
+        event = Event(type='memory_ping', scope=Scope.PUBLIC, detail={'n': 1})
+        with transaction.atomic():
+            MemoryBackend(channel='memory-test').publish(event)
+            time.sleep(0.1)
+            assert dispatched == []
+        time.sleep(0.1)
+        assert [e.id for e in dispatched] == [event.id]
+        assert dispatched[0] is not event
+
+    @pytest.mark.django_db(transaction=True)
+    def test_nothing_sent_on_rollback(self, memory_listener, dispatched):
+        event = Event(type='x', scope=Scope.PUBLIC, detail={})
+        with pytest.raises(RuntimeError), transaction.atomic():
+            MemoryBackend(channel='memory-test').publish(event)
+            raise RuntimeError
+        time.sleep(0.1)
+        assert dispatched == []
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_async_listener(self):
+        with patch.object(Config, 'BACKEND', MEMORY_BACKEND):
+            listener = AsyncListener()
+        listener.start()
+        queue = RequestQueue(user_id='5')
+        sse_connections.add(queue)
+        await asyncio.sleep(0)
+        try:
+            event = Event(type='memory_async', scope=Scope.USER, user_id='5', detail={})
+            await MemoryBackend(channel='memory-test').apublish(event)
+            received = await asyncio.wait_for(queue.get(), timeout=1)
+        finally:
+            sse_connections.discard(queue)
+            listener.stop()
+        assert received.id == event.id
+
+
+class TestRelay:
+    @pytest.fixture()
+    def socket_path(self):
+        # Unix socket paths are limited to about 100 characters, keep it short
+        directory = tempfile.mkdtemp(prefix='djr')
+        yield os.path.join(directory, 'relay.sock')
+        shutil.rmtree(directory, ignore_errors=True)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_elected_relay_forwards_payloads(self, socket_path):
+        received = []
+        listening = RelayBackend(socket=socket_path).listen('djangorealtime')
+        thread = threading.Thread(target=lambda: received.append(next(listening)))
+        thread.start()
+        time.sleep(0.3)  # Election, then the relay's LISTEN
+        PostgreSqlBackend().publish(Event(type='relayed', scope=Scope.SYSTEM, detail={}))
+        thread.join(2)
+        assert '"relayed"' in received[0]
+
+    def test_one_relay_per_socket(self, socket_path):
+        assert Relay(socket_path).acquire()
+        assert not Relay(socket_path).acquire()
+
+    @pytest.fixture()
+    def command_relay(self, socket_path):
+        backend = {
+            'CLASS': 'djangorealtime.backends.relay.RelayBackend',
+            'OPTIONS': {'socket': socket_path, 'channel': 'relayed_channel'},
+        }
+        with patch.object(Config, 'BACKEND', backend), \
+                patch.object(Relay, 'serve_forever', autospec=True) as serve_forever:
+            call_command('djr_relay', stdout=StringIO())
+        return serve_forever.call_args.args[0]
+
+    def test_command_uses_backend_options(self, socket_path, command_relay):
+        assert command_relay.socket_path == socket_path
+        assert command_relay.backend.channel_name == 'relayed_channel'
+
+    @pytest.fixture()
+    def relay(self, socket_path):
+        relay = Relay(socket_path)
+        relay.acquire()
+        threading.Thread(target=relay._accept, daemon=True).start()
+        return relay
+
+    def connect(self, relay, count):
+        sockets = []
+        for _ in range(count):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(relay.socket_path)
+            sockets.append(sock)
+        while len(relay) < count:
+            time.sleep(0.01)
+        return sockets
+
+    @pytest.fixture()
+    def stalled(self, relay):
+        reader, _stalled = self.connect(relay, 2)
+        lines = 1000  # 1MB, well over the stalled worker's socket and relay buffers
+        received = []
+        reader_lines = reader.makefile('r')
+        thread = threading.Thread(
+            target=lambda: received.extend(reader_lines.readline() for _ in range(lines)),
+            daemon=True,
+        )
+        thread.start()
+        started = time.monotonic()
+        with patch.object(relay_module, 'RELAY_CLIENT_BUFFER', 64 * 1024):
+            for n in range(lines):
+                relay.broadcast('x' * 1000)
+                if n % 10 == 0:
+                    time.sleep(0.001)  # Let the reading worker keep up
+            thread.join(5)
+        return relay, received, time.monotonic() - started
+
+    def test_stalled_worker_dropped_without_delaying_others(self, stalled):
+        relay, received, elapsed = stalled
+        assert len(received) == 1000
+        assert elapsed < relay_module.RELAY_SEND_TIMEOUT
+        assert len(relay) == 1
+
+    @pytest.fixture()
+    def accept_failed_once(self, relay):
+        server = relay._server
+        failures = [OSError(errno.EMFILE, 'Too many open files')]
+
+        def accept():
+            if failures:
+                raise failures.pop()
+            return server.accept()
+
+        with patch.object(relay_module, 'RELAY_ACCEPT_BACKOFF', 0):
+            relay._server = MagicMock(accept=accept)
+            time.sleep(0.1)  # The accept thread is already waiting on the real socket
+            self.connect(relay, 2)
+        return relay
+
+    def test_accept_survives_errors(self, accept_failed_once):
+        assert len(accept_failed_once) == 2
+
+    def test_relay_reconnect_triggers_catch_up(self, socket_path):
+        backend = RelayBackend(socket=socket_path)
+        calls = []
+        backend.on_listen = calls.append
+        assert backend._receive('{"type": "x"}') == '{"type": "x"}'
+        alive_at = backend.alive_at
+        assert backend._receive(RELAY_LISTENING) is None
+        assert calls == [alive_at]
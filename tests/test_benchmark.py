@@ -0,0 +1,50 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from djangorealtime.benchmark import percentiles
+
+
+@pytest.fixture()
+def command_results(tmp_path):
+    output = tmp_path / 'results.json'
+    call_command(
+        'djr_benchmark', clients=5, rate=20, duration=0.5, output=str(output), stdout=StringIO()
+    )
+    return json.loads(output.read_text())
+
+
+@pytest.fixture()
+def async_results(tmp_path):
+    output = tmp_path / 'results.json'
+    call_command(
+        'djr_benchmark', clients=5, rate=20, duration=0.5, listener='async',
+        output=str(output), stdout=StringIO(),
+    )
+    return json.loads(output.read_text())
+
+
+class TestBenchmark:
+    @pytest.mark.django_db(transaction=True)
+    def test_command_writes_results(self, command_results):
+        assert command_results['clients'] == 5
+        assert command_results['listener'] == 'thread'  # LISTENER_MODE default
+        assert command_results['published'] > 0
+        assert command_results['delivered'] == command_results['expected_deliveries']
+        assert set(command_results['latency_ms']) == {'p50', 'p99', 'p999', 'max'}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_publish_statements_counted(self, command_results):
+        assert command_results['db_queries'] >= command_results['published']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_async_listener(self, async_results):
+        assert async_results['listener'] == 'async'
+        assert async_results['delivered'] == async_results['expected_deliveries'] > 0
+
+    def test_percentiles(self):
+        assert percentiles(list(range(1, 1001))) == {
+            'p50': 501, 'p99': 991, 'p999': 1000, 'max': 1000
+        }
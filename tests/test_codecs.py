@@ -0,0 +1,116 @@
+from unittest.mock import patch
+
+import pytest
+
+from djangorealtime import codecs
+from djangorealtime.backends.postgresql import batch_payloads
+from djangorealtime.config import Config
+from djangorealtime.listener import Listener
+from djangorealtime.signals import internal_signal
+from djangorealtime.structs import Event, Scope
+
+
+def installed(name):
+    try:
+        codecs.get_codec(name)
+    except ImportError:
+        return False
+    return True
+
+
+CODEC_PARAMS = [
+    pytest.param(name, marks=pytest.mark.skipif(not installed(name), reason=f"{name} missing"))
+    for name in codecs.CODECS
+]
+
+
+@pytest.fixture(params=CODEC_PARAMS)
+def codec(request):
+    with patch.object(Config, 'CODEC', request.param):
+        yield request.param
+
+
+@pytest.fixture()
+def events():
+    return [
+        Event(type='page_imported', scope=Scope.USER, user_id='1', detail={'page_id': i, ':id': i})
+        for i in range(3)
+    ]
+
+
+class TestRoundTrip:
+    def test_single(self, codec, events):
+        decoded = Listener._decode(events[0].to_payload())
+        assert decoded == [events[0]]
+
+    def test_batch(self, codec, events):
+        payloads = batch_payloads([event.to_payload() for event in events])
+        assert len(payloads) == 1
+        assert Listener._decode(payloads[0]) == events
+
+    def test_batches_split_at_limit(self, codec, events):
+        payloads = [event.to_payload() for event in events]
+        batches = batch_payloads(payloads, limit=len(payloads[0]) * 2)
+        assert [event for batch in batches for event in Listener._decode(batch)] == events
+
+    def test_non_string_keys(self, codec):
+        event = Event(type='page_imported', scope=Scope.PUBLIC, detail={1: 'a'})
+        payloads = batch_payloads([event.to_payload(), event.to_payload()])
+        assert [decoded.detail for decoded in Listener._decode(payloads[0])] in (
+            [{'1': 'a'}] * 2, [{1: 'a'}] * 2
+        )
+
+
+class TestAutoDetect:
+    @pytest.mark.skipif(not installed('msgpack'), reason="msgpack missing")
+    def test_decodes_other_codecs(self, events):
+        with patch.object(Config, 'CODEC', 'msgpack'):
+            payload = events[0].to_payload()
+        assert payload.startswith(codecs.MSGPACK_MARKER)
+        assert Listener._decode(payload) == [events[0]]
+
+    def test_json_with_msgpack_codec(self, events):
+        payload = events[0].to_payload()
+        with patch.object(Config, 'CODEC', 'msgpack'):
+            assert codecs.decode(payload)['id'] == events[0].id
+
+
+class TestSseCodec:
+    @pytest.mark.skipif(not installed('orjson'), reason="orjson missing")
+    def test_orjson_frame(self, events):
+        with patch.object(Config, 'SSE_CODEC', 'orjson'):
+            frame = events[0].sse_frame()
+        assert frame.split('\n')[1] == 'data: {"page_id":0,":id":0,"type":"page_imported"}'
+
+    @pytest.mark.skipif(not installed('orjson'), reason="orjson missing")
+    def test_orjson_non_string_keys(self):
+        event = Event(type='x', scope=Scope.PUBLIC, detail={1: 'a'})
+        with patch.object(Config, 'SSE_CODEC', 'orjson'):
+            assert event.sse_frame().split('\n')[1] == 'data: {"1":"a","type":"x"}'
+
+    def test_binary_codec_falls_back_to_json(self, events):
+        with patch.object(Config, 'SSE_CODEC', 'msgpack'):
+            assert codecs.sse_dumps({'a': 1}) == '{"a": 1}'
+
+
+class TestUnencodableFrame:
+    @pytest.fixture()
+    def signals(self):
+        received = []
+
+        def on_event(sender, event, sse_delivered=False, **kwargs):
+            received.append((event, sse_delivered))
+
+        internal_signal.connect(on_event, weak=False)
+        event = Event(type='x', scope=Scope.PUBLIC, detail={'value': object()}, skip_storage=True)
+        Listener()._dispatch(event)
+        internal_signal.disconnect(on_event)
+        return received
+
+    def test_signal_still_sent(self, signals):
+        assert [(event.type, sse_delivered) for event, sse_delivered in signals] == [('x', True)]
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        codecs.get_codec('yaml')
@@ -1,7 +1,17 @@
+import asyncio
+import time
+
 import pytest
+import pytest_asyncio
+from django.db import connection
 
+from djangorealtime import apublish, publish, publish_many_users
+from djangorealtime.activity import activity_writer
+from djangorealtime.listener import AsyncListener
 from djangorealtime.models import Event as EventModel
-from djangorealtime.structs import Scope
+from djangorealtime.queues import RequestQueue
+from djangorealtime.registry import sse_connections
+from djangorealtime.structs import Event, Scope
 
 from .conftest import do_publish
 
@@ -34,6 +44,7 @@ class TestPublish:
 
     def test_database_persistence_with_activity(self, collect_events):
         event = do_publish()
+        activity_writer.flush()
         db_event = EventModel.objects.get(id=event.id)
         assert db_event.type == 'page_imported'
         assert db_event.user_id == '2'
@@ -42,6 +53,57 @@ class TestPublish:
         assert activity.status is not None
         assert activity.created_at is not None
 
+    def test_publish_many(self, collect_events):
+        events = publish_many_users(range(50), 'export_finished', {'data': 'x' * 500})
+        time.sleep(0.3)
+        received = {e.id for e in collect_events if e.type == 'export_finished'}
+        assert received == {e.id for e in events}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncListener:
+    @pytest_asyncio.fixture()
+    async def user_queue(self):
+        listener = AsyncListener()
+        listener.start()
+        await asyncio.sleep(0.2)
+        queue = RequestQueue(user_id='77')
+        sse_connections.add(queue)
+        yield queue
+        sse_connections.discard(queue)
+        listener.stop()
+
+    @pytest.mark.asyncio
+    async def test_event_delivered_on_loop(self, user_queue):
+        event = await apublish(77, 'async_delivery', {'n': 1})
+        received = await asyncio.wait_for(user_queue.get(), timeout=2)
+        assert received.id == event.id
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCatchUp:
+    @pytest.fixture()
+    def missed_event(self, collect_events, start_listener):
+        backend_pid = start_listener.backend._connection.info.backend_pid
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s);", [backend_pid])
+        event = publish(3, 'while_disconnected', {'n': 1})
+        time.sleep(1.5)  # First retry after 1s, then catch-up
+        return event
 
+    def test_missed_event_replayed_after_reconnect(self, missed_event, start_listener):
+        # Listeners of earlier tests received it live, this one only through catch-up
+        assert missed_event.id in start_listener._seen
 
+    def test_seen_events_not_replayed(self, collect_events, start_listener):
+        event = publish(3, 'seen_live', {})
+        time.sleep(0.2)
+        assert start_listener._missed_events(time.time() - 10) == []
+        assert event.id in start_listener._seen
 
+    def test_replayed_event_skipped_when_arriving_live(self, start_listener):
+        event = Event(type='late', scope=Scope.USER, user_id='3', detail={})
+        event.persist()
+        missed = start_listener._missed_events(time.time() - 10)
+        assert [e.id for e in missed] == [event.id]
+        assert start_listener._replayed.discard(event.id)
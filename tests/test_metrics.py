@@ -0,0 +1,59 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.http import Http404
+
+from djangorealtime import metrics, publish, views
+from djangorealtime.config import Config
+from djangorealtime.registry import ConnectionRegistry
+from djangorealtime.structs import Event, Scope
+
+
+@pytest.fixture()
+def enabled():
+    metrics.reset()
+    with patch.object(Config, 'METRICS_ENABLED', True):
+        yield
+    metrics.reset()
+
+
+@pytest.fixture()
+def published(enabled):
+    publish(1, 'invoice_paid', {'invoice': 1})
+    with patch.object(Config, 'ORM_PUBLISH', True):
+        publish(1, 'invoice_paid', {'invoice': 2})
+    ConnectionRegistry().deliver(Event(type='x', scope=Scope.PUBLIC, detail={}))
+    return metrics.snapshot()
+
+
+class TestMetrics:
+    @pytest.mark.django_db
+    def test_publish_phases(self, published):
+        phases = {dict(key)['phase'] for key in published['djangorealtime_publish_seconds']}
+        assert phases == {'persist', 'notify', 'persist_notify'}
+
+    @pytest.mark.django_db
+    def test_fanout_observed(self, published):
+        assert published['djangorealtime_fanout_seconds'][()]['count'] == 1
+
+    @pytest.mark.django_db
+    def test_render_prometheus(self, published):
+        text = metrics.render()
+        assert '# TYPE djangorealtime_publish_seconds histogram' in text
+        assert 'djangorealtime_publish_seconds_count{phase="persist_notify"} 1' in text
+        assert 'djangorealtime_fanout_seconds_bucket{le="+Inf"} 1' in text
+        assert 'djangorealtime_connections 0' in text
+
+    @pytest.mark.django_db
+    def test_disabled_records_nothing(self):
+        metrics.reset()
+        publish(1, 'invoice_paid', {'invoice': 1})
+        assert metrics.snapshot()['djangorealtime_publish_seconds'] == {}
+
+    def test_view_hidden_when_disabled(self):
+        with pytest.raises(Http404):
+            views.metrics_view(MagicMock())
+
+    def test_view(self, enabled):
+        response = views.metrics_view(MagicMock())
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+from djangorealtime import partitions
+from djangorealtime.backends.postgresql import PostgreSqlBackend
+from djangorealtime.models import Event as EventModel
+from djangorealtime.models import EventActivity
+from djangorealtime.structs import Event, Scope, Status
+
+NOW = datetime(2026, 5, 20, 12, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture()
+def frozen_now():
+    with patch('djangorealtime.partitions.timezone.now', return_value=NOW):
+        yield NOW
+
+
+@pytest.fixture()
+def old_event():
+    event = Event(type='page_imported', scope=Scope.PUBLIC, detail={})
+    event.persist()
+    EventModel.add_activities([(event.id, Status.DISPATCHED.value, None)])
+    in_january = datetime(2026, 1, 10, tzinfo=dt_timezone.utc)
+    EventModel.objects.filter(id=event.id).update(created_at=in_january)
+    EventActivity.objects.filter(event_id=event.id).update(created_at=in_january)
+    return event
+
+
+@pytest.fixture()
+def converted(frozen_now, old_event):
+    # DDL is transactional in PostgreSQL, the conversion is rolled back with the test
+    return partitions.convert(interval='month')
+
+
+class TestPeriods:
+    def test_period_start(self):
+        value = datetime(2026, 5, 20, 12, 30)
+        assert partitions.period_start(value, 'day') == datetime(2026, 5, 20)
+        assert partitions.period_start(value, 'week') == datetime(2026, 5, 18)
+        assert partitions.period_start(value, 'month') == datetime(2026, 5, 1)
+
+    def test_next_month_wraps_year(self):
+        assert partitions.next_period(datetime(2026, 12, 1), 'month') == datetime(2027, 1, 1)
+
+    def test_parse_postgresql_bound(self):
+        bound = partitions._parse_bound('2026-10-18 00:00:00+00')
+        assert bound == datetime(2026, 10, 18, tzinfo=dt_timezone.utc)
+
+    def test_invalid_interval(self):
+        with pytest.raises(ValueError):
+            partitions.period_start(NOW, 'year')
+
+
+class TestConvert:
+    @pytest.mark.django_db
+    def test_tables_partitioned(self, converted):
+        assert converted == [EventModel._meta.db_table, EventActivity._meta.db_table]
+        assert partitions.is_partitioned(EventModel)
+        assert partitions.is_partitioned(EventActivity)
+
+    @pytest.mark.django_db
+    def test_partitions(self, converted):
+        names = [p.name for p in partitions.partitions(EventModel)]
+        assert names == [
+            'djangorealtime_event_legacy',
+            'djangorealtime_event_p20260501',
+            'djangorealtime_event_p20260601',
+            'djangorealtime_event_p20260701',
+            'djangorealtime_event_default',
+        ]
+
+    @pytest.mark.django_db
+    def test_rows_kept(self, converted, old_event):
+        model = EventModel.objects.get(id=old_event.id)
+        assert model.activities.get().status == Status.DISPATCHED.value
+
+    @pytest.mark.django_db
+    def test_writes_after_conversion(self, converted, old_event):
+        event = Event(type='page_imported', scope=Scope.PUBLIC, detail={})
+        PostgreSqlBackend().persist_and_publish(event)  # Raw INSERT, relies on column defaults
+        EventModel.add_activities([(event.id, Status.DISPATCHED.value, None)])
+        activity = EventActivity.objects.get(event_id=event.id)
+        assert activity.id > EventActivity.objects.get(event_id=old_event.id).id
+
+    @pytest.mark.django_db
+    def test_idempotent(self, converted):
+        assert partitions.convert(interval='month') == []
+
+
+class TestMaintain:
+    @pytest.mark.django_db
+    def test_drops_expired_activities_and_events(self, converted, old_event):
+        # The legacy partition ends on May 1st, the conversion period
+        created, dropped = partitions.maintain(retention_days=15)
+        assert created == []
+        assert dropped == ['djangorealtime_eventactivity_legacy', 'djangorealtime_event_legacy']
+        assert not EventModel.objects.filter(id=old_event.id).exists()
+
+    @pytest.mark.django_db
+    def test_keeps_unexpired(self, converted):
+        assert partitions.drop_expired_partitions(retention_days=365) == []
+
+    @pytest.mark.django_db
+    def test_creates_upcoming(self, converted):
+        later = NOW + timedelta(days=62)
+        with patch('djangorealtime.partitions.timezone.now', return_value=later):
+            created = partitions.create_partitions(premake=2)
+        assert 'djangorealtime_event_p20260801' in created
+        assert 'djangorealtime_event_p20260901' in created
+
+    @pytest.mark.django_db
+    def test_moves_rows_out_of_default(self, converted):
+        event = Event(type='page_imported', scope=Scope.PUBLIC, detail={})
+        event.persist()
+        in_august = datetime(2026, 8, 15, tzinfo=dt_timezone.utc)
+        EventModel.objects.filter(id=event.id).update(created_at=in_august)
+
+        partitions.create_partitions(premake=3)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id FROM djangorealtime_event_p20260801')
+            assert cursor.fetchall() == [(event.id,)]
+            cursor.execute('SELECT count(*) FROM djangorealtime_event_default')
+            assert cursor.fetchone()[0] == 0
+
+
+class TestCommand:
+    @pytest.mark.django_db
+    def test_requires_conversion(self, frozen_now):
+        with pytest.raises(CommandError):
+            call_command('djr_partition', stdout=StringIO())
+
+    @pytest.fixture()
+    def referencing_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE app_receipt (event_id varchar(36) '
+                'REFERENCES djangorealtime_event (id) DEFERRABLE INITIALLY DEFERRED)'
+            )
+
+    @pytest.mark.django_db
+    def test_refuses_other_foreign_keys(self, frozen_now, referencing_table):
+        with pytest.raises(CommandError, match='app_receipt'):
+            call_command('djr_partition', '--convert', stdout=StringIO())
+
+    @pytest.mark.django_db
+    def test_convert_and_drop(self, frozen_now, old_event):
+        out = StringIO()
+        call_command('djr_partition', '--convert', '--retention-days', '15', stdout=out)
+        output = out.getvalue()
+        assert 'Converted djangorealtime_event' in output
+        assert 'Dropped djangorealtime_event_legacy' in output
@@ -0,0 +1,221 @@
+import asyncio
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from django.core.management import call_command
+from django.db.models.signals import post_save
+
+from djangorealtime import (
+    apublish,
+    apublish_global,
+    publish,
+    publish_global,
+    publish_many_global,
+    publish_many_users,
+    publisher,
+    replay_queryset,
+)
+from djangorealtime.backends.postgresql import NOTIFY_PAYLOAD_LIMIT, batch_payloads
+from djangorealtime.config import Config
+from djangorealtime.listener import Listener
+from djangorealtime.models import Event as EventModel
+from djangorealtime.publisher import debouncer
+from djangorealtime.structs import Event, Scope, Status
+
+
+@pytest.fixture()
+def saved_models():
+    saved = []
+
+    def on_save(sender, instance, **kwargs):
+        saved.append(instance)
+
+    post_save.connect(on_save, sender=EventModel)
+    yield saved
+    post_save.disconnect(on_save, sender=EventModel)
+
+
+class TestSingleRoundTripPublish:
+    @pytest.fixture()
+    def published(self, saved_models):
+        event = publish(7, 'invoice_paid', {'invoice': 1}, private_data={'amount': 10})
+        return event, saved_models
+
+    @pytest.mark.django_db
+    def test_event_persisted(self, published):
+        event, _ = published
+        model = EventModel.objects.get(id=event.id)
+        assert (model.type, model.scope, model.user_id) == ('invoice_paid', 'user', '7')
+        assert model.detail == {'invoice': 1}
+        assert model.private_data == {'amount': 10}
+        assert model.status == 'new'
+        assert model.created_at is not None
+
+    @pytest.mark.django_db
+    def test_skips_orm_signals(self, published):
+        _, saved = published
+        assert saved == []
+
+
+class TestOrmPublish:
+    @pytest.fixture()
+    def published(self, saved_models):
+        with patch.object(Config, 'ORM_PUBLISH', True):
+            event = publish(7, 'invoice_paid', {'invoice': 1})
+        return event, saved_models
+
+    @pytest.mark.django_db
+    def test_fires_orm_signals(self, published):
+        event, saved = published
+        assert [m.id for m in saved] == [event.id]
+
+
+class TestPublishMany:
+    @pytest.fixture()
+    def user_events(self):
+        return publish_many_users([1, 2, 3], 'export_finished', {'export_id': 9})
+
+    @pytest.mark.django_db
+    def test_returns_event_per_user(self, user_events):
+        assert [e.user_id for e in user_events] == ['1', '2', '3']
+
+    @pytest.mark.django_db
+    def test_events_persisted(self, user_events):
+        assert EventModel.objects.filter(id__in=[e.id for e in user_events]).count() == 3
+
+    @pytest.mark.django_db
+    def test_global_events(self):
+        events = publish_many_global('row_updated', [{':id': 1}, {':id': 2}])
+        assert [e.scope for e in events] == [Scope.PUBLIC, Scope.PUBLIC]
+        assert EventModel.objects.filter(type='row_updated').count() == 2
+
+
+class TestBatchPayloads:
+    @pytest.fixture()
+    def payloads(self):
+        return [
+            Event(type='big', scope=Scope.PUBLIC, detail={'data': 'x' * 1000}).to_json()
+            for _ in range(20)
+        ]
+
+    def test_batches_fit_notify_limit(self, payloads):
+        batches = batch_payloads(payloads)
+        assert 1 < len(batches) < len(payloads)
+        assert all(len(batch.encode()) < NOTIFY_PAYLOAD_LIMIT for batch in batches)
+
+    def test_batches_decode_to_all_events(self, payloads):
+        decoded = [e for batch in batch_payloads(payloads) for e in Listener._decode(batch)]
+        assert len(decoded) == len(payloads)
+
+    def test_single_payload_not_wrapped(self, payloads):
+        assert batch_payloads(payloads[:1]) == payloads[:1]
+
+
+class TestAsyncPublish:
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_apublish_persists(self):
+        event = await apublish(5, 'report_ready', {'report': 3}, private_data={'path': '/x'})
+        model = await EventModel.objects.aget(id=event.id)
+        assert (model.user_id, model.detail) == ('5', {'report': 3})
+        assert model.private_data == {'path': '/x'}
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_apublish_global_orm_path(self, saved_models):
+        with patch.object(Config, 'ORM_PUBLISH', True):
+            event = await apublish_global('news', {'headline': 'x'})
+        assert [m.id for m in saved_models] == [event.id]
+        assert await EventModel.objects.filter(id=event.id).aexists()
+
+
+class TestAsyncConnections:
+    @pytest.fixture()
+    def backend(self):
+        backend = publisher._get_backend()
+        backend._async_connections.clear()
+        return backend
+
+    @pytest_asyncio.fixture()
+    async def concurrent(self, backend):
+        await asyncio.gather(*(apublish(i, 'report_ready', {'n': i}) for i in range(20)))
+        return backend._async_pool()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_concurrent_publishes_share_connections(self, concurrent):
+        assert len(concurrent) == Config.ASYNC_PUBLISH_CONNECTIONS
+
+    @pytest.mark.django_db(transaction=True)
+    def test_closed_loop_connections_closed(self, backend):
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(apublish(1, 'report_ready'))
+        pool = backend._async_connections[loop]
+        connections = list(pool._opened)
+        loop.close()
+        asyncio.run(apublish(2, 'report_ready'))
+        assert loop not in backend._async_connections
+        assert len(pool) == 0 and all(conn.closed for conn in connections)
+
+
+class TestDebounce:
+    @pytest.fixture()
+    def debounced(self):
+        with patch.object(Config, 'PUBLISH_DEBOUNCE', {'progress': 60}):
+            for percent in (10, 50, 90):
+                publish_global('progress', {':id': 'import-1', 'percent': percent})
+            publish_global('progress', {'percent': 100})
+            stored_before_flush = EventModel.objects.filter(type='progress').count()
+            debouncer.flush(force=True)
+        return stored_before_flush, list(EventModel.objects.filter(type='progress'))
+
+    @pytest.mark.django_db
+    def test_event_without_id_published_immediately(self, debounced):
+        stored_before_flush, _ = debounced
+        assert stored_before_flush == 1
+
+    @pytest.mark.django_db
+    def test_only_latest_published(self, debounced):
+        _, stored = debounced
+        assert sorted(e.detail.get(':id', '') for e in stored) == ['', 'import-1']
+        assert {e.detail['percent'] for e in stored} == {90, 100}
+
+
+class TestReplayQueryset:
+    @pytest.fixture()
+    def stored(self):
+        events = publish_many_users(range(5), 'replayed', {'n': 1})
+        EventModel.objects.filter(type='replayed').update(status=Status.SENT.value)
+        return events
+
+    @pytest.fixture()
+    def replayed(self, stored):
+        progress = []
+        with patch.object(publisher._get_backend(), 'publish_many') as publish_many:
+            count = replay_queryset(
+                EventModel.objects.filter(type='replayed'), chunk_size=2, progress=progress.append
+            )
+        batches = [[event.id for event in call.args[0]] for call in publish_many.call_args_list]
+        return count, progress, batches
+
+    @pytest.mark.django_db
+    def test_batched_in_creation_order(self, stored, replayed):
+        count, progress, batches = replayed
+        assert count == 5
+        assert progress == [2, 4, 5]
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert sorted(i for batch in batches for i in batch) == sorted(e.id for e in stored)
+
+    @pytest.mark.django_db
+    def test_statuses_reset(self, replayed):
+        statuses = set(EventModel.objects.filter(type='replayed').values_list('status', flat=True))
+        assert statuses == {Status.NEW.value}
+
+    @pytest.mark.django_db
+    def test_command(self, stored):
+        out = StringIO()
+        with patch.object(publisher._get_backend(), 'publish_many'):
+            call_command('djr_replay', '--type', 'replayed', '--user-id', '3', stdout=out)
+        assert 'Replayed 1 events' in out.getvalue()
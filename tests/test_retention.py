@@ -0,0 +1,121 @@
+import gzip
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from djangorealtime import retention
+from djangorealtime.config import Config
+from djangorealtime.models import Event as EventModel
+from djangorealtime.models import EventActivity
+from djangorealtime.structs import Event, Scope, Status
+
+
+def persist(event_type, scope=Scope.PUBLIC, age_days=0, user_id=None):
+    event = Event(type=event_type, scope=scope, detail={'n': 1}, user_id=user_id)
+    event.persist()
+    EventModel.add_activities([(event.id, Status.DISPATCHED.value, None)])
+    created_at = timezone.now() - timedelta(days=age_days)
+    EventModel.objects.filter(id=event.id).update(created_at=created_at)
+    return event.id
+
+
+@pytest.fixture()
+def rules():
+    Config.RETENTION_DAYS = 30
+    Config.RETENTION_BY_TYPE = {'cursor_moved': 1, 'invoice_paid': None}
+    Config.RETENTION_BY_SCOPE = {Scope.USER.value: 7}
+    Config.PRUNE_SLEEP = 0
+
+
+@pytest.fixture()
+def events(rules):
+    return {
+        'old_cursor': persist('cursor_moved', age_days=2),
+        'new_cursor': persist('cursor_moved', age_days=0),
+        'old_invoice': persist('invoice_paid', age_days=400),
+        'old_user': persist('page_imported', scope=Scope.USER, age_days=10, user_id='1'),
+        'new_user': persist('page_imported', scope=Scope.USER, age_days=3, user_id='1'),
+        'old_public': persist('page_imported', age_days=31),
+        'older_public': persist('page_imported', age_days=40),
+        'new_public': persist('page_imported', age_days=10),
+    }
+
+
+@pytest.fixture()
+def pruned(events):
+    progress = []
+    result = retention.prune(batch_size=1, progress=lambda *args: progress.append(args))
+    return result, progress
+
+
+class TestRetentionRules:
+    def test_most_specific_first(self, rules):
+        labels = [rule.label for rule in retention.retention_rules()]
+        assert labels == ['type=cursor_moved', 'scope=user', 'default']
+
+    def test_days_override(self, rules):
+        assert retention.retention_rules(days=90)[-1].days == 90
+
+
+class TestPrune:
+    @pytest.mark.django_db
+    def test_deletes_expired(self, events, pruned):
+        remaining = set(EventModel.objects.values_list('id', flat=True))
+        kept = ('new_cursor', 'old_invoice', 'new_user', 'new_public')
+        assert remaining == {events[name] for name in kept}
+
+    @pytest.mark.django_db
+    def test_deletes_activities(self, events, pruned):
+        result, _ = pruned
+        assert (result.events, result.activities) == (4, 4)
+        assert not EventActivity.objects.filter(event_id=events['old_public']).exists()
+
+    @pytest.mark.django_db
+    def test_batches(self, pruned):
+        _, progress = pruned
+        assert progress == [
+            ('type=cursor_moved', 1), ('scope=user', 1), ('default', 1), ('default', 2),
+        ]
+
+    @pytest.mark.django_db
+    def test_count_expired(self, events):
+        assert retention.count_expired() == {'type=cursor_moved': 1, 'scope=user': 1, 'default': 2}
+
+
+class TestArchive:
+    @pytest.fixture()
+    def archived(self, events, tmp_path):
+        result = retention.prune(archive_dir=str(tmp_path))
+        with gzip.open(result.archive, 'rt') as archive:
+            return [json.loads(line) for line in archive]
+
+    @pytest.mark.django_db
+    def test_rows_archived(self, events, archived):
+        archived_events = {row['id'] for row in archived if row['table'] == 'event'}
+        expired = ('old_cursor', 'old_user', 'old_public', 'older_public')
+        assert archived_events == {events[name] for name in expired}
+
+    @pytest.mark.django_db
+    def test_activities_archived(self, events, archived):
+        activities = [row for row in archived if row['table'] == 'activity']
+        assert len(activities) == 4
+        assert activities[0]['status'] == Status.DISPATCHED.value
+
+
+class TestCommand:
+    @pytest.mark.django_db
+    def test_dry_run(self, events):
+        out = StringIO()
+        call_command('djr_prune', '--dry-run', stdout=out)
+        assert 'default: 2 expired events' in out.getvalue()
+        assert EventModel.objects.filter(id=events['old_public']).exists()
+
+    @pytest.mark.django_db
+    def test_prune(self, events):
+        out = StringIO()
+        call_command('djr_prune', '--days', '5', stdout=out)
+        assert 'Pruned 5 events and 5 activities' in out.getvalue()
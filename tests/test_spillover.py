@@ -0,0 +1,112 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from djangorealtime import publish, spillover
+from djangorealtime.backends.postgresql import NOTIFY_PAYLOAD_LIMIT, notify_payload
+from djangorealtime.codecs import decode
+from djangorealtime.config import Config
+from djangorealtime.listener import Listener
+from djangorealtime.structs import Event, Scope
+
+BIG_DETAIL = {'html': 'x' * NOTIFY_PAYLOAD_LIMIT}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    spillover.body_cache.clear()
+    yield
+    spillover.body_cache.clear()
+
+
+@pytest.fixture()
+def stored():
+    events = [
+        Event(type='report_ready', scope=Scope.USER, user_id='5', detail={**BIG_DETAIL, 'n': i})
+        for i in range(3)
+    ]
+    for event in events:
+        event.persist()
+    return events
+
+
+@pytest.fixture()
+def references(stored):
+    return [item for event in stored for item in Listener._decode(notify_payload(event))]
+
+
+class TestNotifyPayload:
+    def test_small_event_unchanged(self):
+        event = Event(type='page_imported', scope=Scope.PUBLIC, detail={'page_id': 1})
+        assert notify_payload(event) == event.to_payload()
+
+    @pytest.mark.django_db
+    def test_big_event_sends_reference(self, stored):
+        payload = notify_payload(stored[0])
+        assert len(payload) < 200
+        assert decode(payload) == {
+            'ref': 1, 'id': stored[0].id, 'type': 'report_ready', 'scope': 'user', 'user_id': '5',
+        }
+
+    def test_needs_storage(self):
+        event = Event(
+            type='report_ready', scope=Scope.PUBLIC, detail=BIG_DETAIL, skip_storage=True
+        )
+        with pytest.raises(ValueError):
+            notify_payload(event)
+
+
+class TestResolve:
+    @pytest.mark.django_db
+    def test_references_decoded(self, references):
+        assert all(isinstance(item, spillover.Reference) for item in references)
+        assert references[0].user_id == '5'
+
+    @pytest.mark.django_db
+    def test_one_query(self, stored, references):
+        with CaptureQueriesContext(connection) as queries:
+            resolved = spillover.resolve(references)
+        assert len(queries) == 1
+        assert [event.detail['n'] for event in resolved] == [0, 1, 2]
+        assert resolved[0].detail['html'] == BIG_DETAIL['html']
+
+    @pytest.mark.django_db
+    def test_cached(self, references):
+        spillover.resolve(references)
+        with CaptureQueriesContext(connection) as queries:
+            first, second = spillover.resolve(references[:1]), spillover.resolve(references[:1])
+        assert len(queries) == 0
+        assert first[0] == second[0] and first[0] is not second[0]
+
+    @pytest.mark.django_db
+    def test_cache_expires(self, references):
+        Config.SPILLOVER_CACHE_TTL = 0
+        spillover.resolve(references)
+        time.sleep(0.01)
+        assert spillover.body_cache.get(references[0].id) is None
+
+    @pytest.mark.django_db
+    def test_cache_size(self, references):
+        Config.SPILLOVER_CACHE_SIZE = 2
+        spillover.resolve(references)
+        assert len(spillover.body_cache) == 2
+        assert spillover.body_cache.get(references[0].id) is None
+
+    @pytest.mark.django_db
+    def test_missing_row_skipped(self, references):
+        small = Event(type='page_imported', scope=Scope.PUBLIC, detail={})
+        missing = spillover.Reference('unknown', 'report_ready', Scope.PUBLIC)
+        resolved = spillover.resolve([small, missing, references[0]])
+        assert [event.id for event in resolved] == [small.id, references[0].id]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestDelivery:
+    def test_big_event_delivered(self, collect_events):
+        event = publish(5, 'report_ready', BIG_DETAIL)
+        time.sleep(0.3)
+        received = [e for e in collect_events if e.id == event.id]
+        assert received
+        assert all(e.detail == BIG_DETAIL for e in received)
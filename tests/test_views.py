@@ -1,10 +1,16 @@
-from unittest.mock import MagicMock
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
 
 import pytest
 import pytest_asyncio
 from asgiref.sync import sync_to_async
 
 from djangorealtime import views
+from djangorealtime.config import Config
+from djangorealtime.heartbeat import HeartbeatTicker
+from djangorealtime.queues import HEARTBEAT, RequestQueue, Subscription, SyncRequestQueue
+from djangorealtime.registry import ConnectionRegistry
 from djangorealtime.structs import Event, Scope
 
 
@@ -86,6 +92,27 @@ class TestEvent:
         event_dict = event.to_dict()
         assert event_dict['type'] == 'page_imported'
         assert event_dict['detail']['page_id'] == 42
+        assert '_sse_frame' not in event_dict
+
+    def test_sse_frame_does_not_mutate_detail(self, event):
+        assert event.sse_frame() == (
+            f'id: {event.id}\ndata: {{"page_id": 42, "type": "page_imported"}}\n\n'
+        )
+        assert 'type' not in event.detail
+
+    def test_sse_frame_is_reused(self, event):
+        assert event.sse_frame() is event.sse_frame()
+
+    def test_sse_frame_reencoded_after_change(self, event):
+        event.sse_frame()
+        event.detail['page_id'] = 43
+        assert '"page_id": 43' in event.sse_frame()
+
+    def test_sse_frame_reencoded_after_assignment(self, event):
+        event.sse_frame()
+        event.detail = {'page_id': 44}
+        event.type = 'page_deleted'
+        assert '"page_id": 44, "type": "page_deleted"' in event.sse_frame()
 
     @pytest.mark.django_db
     def test_event_model(self, persisted_event):
@@ -96,3 +123,336 @@ class TestEvent:
     def test_event_model_private_data(self, persisted_event):
         assert persisted_event.model().private_data == {'page_title': 'Home Page'}
 
+
+
+class TestConnectionRegistry:
+    @pytest.fixture()
+    def registry(self):
+        registry = ConnectionRegistry()
+        registry.add(RequestQueue(user_id='1'))
+        registry.add(RequestQueue(user_id='2'))
+        registry.add(RequestQueue(user_id=None))
+        return registry
+
+    def test_user_event_only_reaches_user(self, registry):
+        event = Event(type='x', scope=Scope.USER, user_id=1, detail={})
+        assert [q.user_id for q in registry.recipients(event)] == ['1']
+
+    def test_public_event_reaches_everyone(self, registry):
+        event = Event(type='x', scope=Scope.PUBLIC, detail={})
+        assert len(registry.recipients(event)) == 3
+
+    def test_system_event_reaches_nobody(self, registry):
+        event = Event(type='x', scope=Scope.SYSTEM, user_id='1', detail={})
+        assert registry.recipients(event) == ()
+
+    def test_discard_drops_empty_user_bucket(self, registry):
+        queue = next(iter(registry.users['1']))
+        registry.discard(queue)
+        assert '1' not in registry.users
+        assert len(registry) == 2
+
+
+class TestSubscriptions:
+    @pytest.fixture()
+    def registry(self):
+        registry = ConnectionRegistry()
+        registry.add(RequestQueue(user_id=None))
+        registry.add(RequestQueue(user_id='1', subscription=Subscription.parse('chat_message')))
+        registry.add(RequestQueue(user_id='1', subscription=Subscription.parse('order_*')))
+        registry.add(RequestQueue(user_id=None, subscription=Subscription.parse('order_*,x')))
+        return registry
+
+    def recipients(self, registry, event_type, scope=Scope.PUBLIC):
+        event = Event(type=event_type, scope=scope, user_id='1', detail={})
+        return sorted(str(queue.subscription) for queue in registry.recipients(event))
+
+    def test_parse(self):
+        subscription = Subscription.parse(' chat_message, order_*,,')
+        assert subscription == Subscription(frozenset({'chat_message'}), ('order_',))
+
+    @pytest.mark.parametrize('value', [None, '', ',', 'x,*'])
+    def test_parse_everything(self, value):
+        assert Subscription.parse(value) is None
+
+    def test_unsubscribed_type_reaches_unfiltered_only(self, registry):
+        assert self.recipients(registry, 'page_imported') == ['None']
+
+    def test_exact_type(self, registry):
+        assert len(self.recipients(registry, 'chat_message')) == 2
+
+    def test_prefix(self, registry):
+        assert len(self.recipients(registry, 'order_shipped')) == 3
+
+    def test_queue_in_several_indexes_once(self, registry):
+        assert len(self.recipients(registry, 'x')) == 2
+
+    def test_user_event(self, registry):
+        recipients = self.recipients(registry, 'order_paid', scope=Scope.USER)
+        assert recipients == [str(Subscription(prefixes=('order_',)))]
+
+    def test_discard_drops_empty_index_keys(self, registry):
+        for queue in list(registry):
+            registry.discard(queue)
+        assert (registry.unfiltered, registry.by_type, registry.by_prefix) == (set(), {}, {})
+
+    @pytest.mark.asyncio
+    async def test_stream_subscription(self):
+        request = MagicMock()
+        request.GET = {'types': 'chat_message,order_*'}
+        gen = views.event_stream(request)
+        await gen.__anext__()
+        queue = next(iter(views.sse_connections))
+        await gen.aclose()
+        assert queue.subscription == Subscription(frozenset({'chat_message'}), ('order_',))
+
+    @pytest.fixture()
+    def missed(self):
+        events = [
+            Event(type=event_type, scope=Scope.PUBLIC, detail={})
+            for event_type in ('first', 'order_paid', 'page_imported', 'chat_message')
+        ]
+        for event in events:
+            event.persist()
+        subscription = Subscription.parse('order_*,chat_message')
+        return views._missed_events(events[0].id, None, subscription)
+
+    @pytest.mark.django_db
+    def test_replay_filtered(self, missed):
+        assert [event.type for event in missed] == ['order_paid', 'chat_message']
+
+
+class TestLastEventIdReplay:
+    @pytest.fixture()
+    def stored_events(self):
+        events = [
+            Event(type='first', scope=Scope.PUBLIC, detail={}),
+            Event(type='mine', scope=Scope.USER, user_id='123', detail={}),
+            Event(type='not_mine', scope=Scope.USER, user_id='456', detail={}),
+            Event(type='public', scope=Scope.PUBLIC, detail={}),
+        ]
+        for event in events:
+            event.persist()
+        return events
+
+    @pytest_asyncio.fixture()
+    async def resumed_stream(self, stored_events):
+        request = MagicMock()
+        request.user.pk = 123
+        request.headers = {'Last-Event-ID': stored_events[0].id}
+        gen = views.event_stream(request)
+        frames = [await gen.__anext__() for _ in range(3)]
+        yield frames
+        await gen.aclose()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_missed_events_replayed(self, resumed_stream, stored_events):
+        _connected, mine, public = resumed_stream
+        assert mine.startswith(f'id: {stored_events[1].id}\n')
+        assert public.startswith(f'id: {stored_events[3].id}\n')
+
+    @pytest.mark.django_db
+    def test_unknown_last_event_id(self):
+        assert views._missed_events('unknown', '123') == []
+
+    @pytest.fixture()
+    def hooked(self, stored_events):
+        def hook(event):
+            if event.type == 'public':
+                return None
+            event.detail['received_at'] = 'now'
+            return event
+
+        with patch.object(Config, 'ON_RECEIVE_HOOK', hook):
+            return views._missed_events(stored_events[0].id, '123')
+
+    @pytest.mark.django_db
+    def test_on_receive_hook_applied(self, hooked):
+        assert [(event.type, event.detail) for event in hooked] == [
+            ('mine', {'received_at': 'now'}),
+        ]
+
+
+class TestOverflowPolicy:
+    @staticmethod
+    def _events(count, **detail):
+        return [
+            Event(type='x', scope=Scope.PUBLIC, detail={'n': n, **detail}) for n in range(count)
+        ]
+
+    @pytest.fixture()
+    def registry(self):
+        return ConnectionRegistry()
+
+    def _fill(self, registry, policy, events):
+        queue = RequestQueue(user_id=None, maxsize=2, policy=policy)
+        registry.add(queue)
+        for event in events:
+            registry.deliver(event)
+        return queue
+
+    def test_drop_newest(self, registry):
+        queue = self._fill(registry, 'drop_newest', self._events(3))
+        assert [e.detail['n'] for e in queue._queue] == [0, 1]
+        assert queue.dropped == registry.dropped == 1
+
+    def test_drop_oldest(self, registry):
+        queue = self._fill(registry, 'drop_oldest', self._events(3))
+        assert [e.detail['n'] for e in queue._queue] == [1, 2]
+        assert queue.dropped == registry.dropped == 1
+
+    def test_coalesce_replaces_same_key(self, registry):
+        events = [
+            Event(type='x', scope=Scope.PUBLIC, detail={':id': 1, 'v': 'a'}),
+            Event(type='x', scope=Scope.PUBLIC, detail={':id': 2, 'v': 'b'}),
+            Event(type='x', scope=Scope.PUBLIC, detail={':id': 1, 'v': 'c'}),
+        ]
+        queue = self._fill(registry, 'coalesce', events)
+        assert [e.detail['v'] for e in queue._queue] == ['b', 'c']
+        assert queue.dropped == 1
+
+    def test_coalesce_without_key_drops_oldest(self, registry):
+        queue = self._fill(registry, 'coalesce', self._events(3))
+        assert [e.detail['n'] for e in queue._queue] == [1, 2]
+
+    def test_disconnect(self, registry):
+        queue = self._fill(registry, 'disconnect', self._events(3))
+        assert queue.overflowed
+        assert queue not in registry
+        assert registry.disconnected == 1
+        assert registry.dropped == 3
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            RequestQueue(user_id=None, policy='drop_everything')
+
+
+class TestConflation:
+    @pytest.fixture()
+    def drained(self):
+        events = [
+            Event(type='price', scope=Scope.PUBLIC, detail={':id': 1, 'v': 1}),
+            Event(type='price', scope=Scope.PUBLIC, detail={':id': 2, 'v': 2}),
+            Event(type='price', scope=Scope.PUBLIC, detail={':id': 1, 'v': 3}),
+            Event(type='chat', scope=Scope.PUBLIC, detail={':id': 1, 'v': 4}),
+            Event(type='chat', scope=Scope.PUBLIC, detail={':id': 1, 'v': 5}),
+        ]
+        with patch.object(Config, 'CONFLATE_EVENT_TYPES', frozenset({'price'})):
+            queue = RequestQueue(user_id=None)
+            for event in events:
+                queue.offer(event)
+            drained = [queue.get_nowait().detail['v'] for _ in range(queue.qsize())]
+            queue.offer(events[0])
+            drained.append(queue.get_nowait().detail['v'])
+        return queue, drained
+
+    def test_latest_event_replaces_queued_one(self, drained):
+        _, values = drained
+        assert values[:4] == [3, 2, 4, 5]
+
+    def test_conflation_only_while_queued(self, drained):
+        _, values = drained
+        assert values[4] == 1
+
+    def test_conflated_counted(self, drained):
+        queue, _ = drained
+        assert queue.conflated == 1
+        assert queue.dropped == 0
+
+
+class TestHeartbeatTicker:
+    @pytest_asyncio.fixture()
+    async def ticked(self):
+        ticker = HeartbeatTicker()
+        idle, active = RequestQueue(user_id='1'), RequestQueue(user_id='2')
+        ticker.add(idle)
+        ticker.add(active)
+        idle.last_sent -= Config.HEARTBEAT_INTERVAL
+        ticker.tick()
+        ticker.tick()
+        yield idle, active
+        ticker.discard(idle)
+        ticker.discard(active)
+
+    @pytest.mark.asyncio
+    async def test_idle_stream_gets_one_heartbeat(self, ticked):
+        idle, _ = ticked
+        assert idle.qsize() == 1
+        assert idle.get_nowait() is HEARTBEAT
+
+    @pytest.mark.asyncio
+    async def test_recently_active_stream_skipped(self, ticked):
+        _, active = ticked
+        assert active.empty()
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_heartbeat(self):
+        with patch.object(Config, 'HEARTBEAT_INTERVAL', 0.01):
+            gen = views.event_stream(MagicMock(spec=['method']))
+            await gen.__anext__()
+            message = await gen.__anext__()
+            await gen.aclose()
+        assert message == ': heartbeat\n\n'
+
+
+class TestSyncStreaming:
+    @pytest.fixture()
+    def sync_stream(self):
+        gen = views.event_stream_sync(MagicMock(spec=['method']))
+        next(gen)
+        yield gen
+        gen.close()
+
+    def test_event_from_other_thread(self, sync_stream, event):
+        threading.Timer(0.05, views.sse_connections.deliver, args=[event]).start()
+        assert next(sync_stream).startswith(f'id: {event.id}\n')
+
+    def test_heartbeat(self, sync_stream):
+        queue = next(iter(views.sse_connections))
+        queue.last_sent -= Config.HEARTBEAT_INTERVAL
+        views.sync_heartbeat.tick()
+        assert next(sync_stream) == ': heartbeat\n\n'
+
+    def test_closed_stream_unregistered(self, sync_stream):
+        queue = next(iter(views.sse_connections))
+        sync_stream.close()
+        assert queue not in views.sse_connections
+
+    def test_sync_queue_policy(self):
+        queue = SyncRequestQueue(user_id=None, maxsize=2, policy='drop_oldest')
+        for n in range(3):
+            queue.offer(Event(type='x', scope=Scope.PUBLIC, detail={'n': n}))
+        assert [queue.get(timeout=0).detail['n'] for _ in range(2)] == [1, 2]
+        assert queue.dropped == 1
+
+
+class TestCrossThreadOffer:
+    @pytest.mark.asyncio
+    async def test_offer_from_thread_wakes_stream(self):
+        queue = RequestQueue(user_id=None)
+        event = Event(type='x', scope=Scope.PUBLIC, detail={})
+        threading.Timer(0.05, queue.offer, args=[event]).start()
+        assert await asyncio.wait_for(queue.get(), timeout=1) is event
+
+    @pytest_asyncio.fixture()
+    async def delivered(self):
+        registry = ConnectionRegistry()
+        queues = [RequestQueue(user_id=None) for _ in range(3)]
+        for queue in queues:
+            registry.add(queue)
+        event = Event(type='x', scope=Scope.PUBLIC, detail={})
+        loop = asyncio.get_running_loop()
+        wakeup = loop.call_soon_threadsafe
+        with patch.object(loop, 'call_soon_threadsafe', wraps=wakeup) as handover:
+            thread = threading.Thread(target=registry.deliver, args=[event])
+            thread.start()
+            thread.join()
+            received = [await asyncio.wait_for(queue.get(), timeout=1) for queue in queues]
+        return event, received, handover.call_count
+
+    @pytest.mark.asyncio
+    async def test_deliver_from_thread_hands_over_once_per_loop(self, delivered):
+        event, received, handovers = delivered
+        assert received == [event] * 3
+        assert handovers == 1